@@ -1,7 +1,6 @@
 #!/bin/sh
 
-mkdir -p /prj/vc6
-cp -R /opt/vc/ATL /prj/vc6
-cp -R /opt/vc/CRT /prj/vc6
-cp -R /opt/vc/INCLUDE /prj/vc6
-cp -R /opt/vc/MFC /prj/vc6
+# Mirror the VC6 headers into /prj/vc6. Only new or changed files are
+# copied (or hardlinked when /prj is on the same filesystem) and files
+# removed from the toolchain are deleted again, so repeated runs are fast.
+python3 /opt/vc/tools/sync_includes.py /opt/vc /prj/vc6 ATL CRT INCLUDE MFC
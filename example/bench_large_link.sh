@@ -0,0 +1,97 @@
+#!/bin/bash
+
+# Benchmark the link proxy on a very large link and report its peak memory.
+#
+# Usage: bench_large_link.sh [OBJECT_COUNT] [MAX_RSS_MB]
+#
+# A CMake-style response file with OBJECT_COUNT objects (default 50000) on
+# a single line is linked through LinkExe with stub wine and winepath
+# commands. The stub linker reads the generated response file and prints a
+# /VERBOSE-style line for every input, so both the input and the output
+# path are exercised without Wine. Peak RSS of the proxy is reported, and
+# the script exits non-zero when it is above MAX_RSS_MB (default 64).
+
+# Exit on error
+set -e
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+PARENT_DIR="$(dirname "$SCRIPT_DIR")"
+TOOLS_DIR="$PARENT_DIR/tools"
+
+COUNT="${1:-50000}"
+MAX_RSS_MB="${2:-64}"
+
+WORK_DIR="$(mktemp -d)"
+trap 'rm -rf "$WORK_DIR"' EXIT
+
+# Stub winepath: Z: maps to /
+mkdir -p "$WORK_DIR/bin"
+cat > "$WORK_DIR/bin/winepath" << 'EOF'
+#!/bin/sh
+if [ "$1" = "-w" ]; then
+    printf 'Z:%s\n' "$2" | tr / '\\'
+else
+    printf '%s\n' "$2"
+fi
+EOF
+
+# Stub wine: runs "cmd /c batch" by reading the LINK.EXE line of the batch
+cat > "$WORK_DIR/bin/wine" << 'EOF'
+#!/usr/bin/python3
+import sys
+
+def unix(path):
+    return path[2:].replace('\\', '/') if path[1:2] == ':' else path
+
+for line in open(unix(sys.argv[3])):
+    if not line.startswith('LINK.EXE'):
+        continue
+    for token in line.split():
+        if token.startswith('@'):
+            with open(unix(token[1:])) as response:
+                for entry in response:
+                    print("      Searching", entry.strip())
+        elif token.startswith('/out:'):
+            open(unix(token[5:]), 'wb').close()
+EOF
+chmod +x "$WORK_DIR/bin/winepath" "$WORK_DIR/bin/wine"
+export PATH="$WORK_DIR/bin:$PATH"
+
+# CMake writes all objects of a link on one line of the response file
+python3 - "$WORK_DIR/objects1.rsp" "$COUNT" << 'EOF'
+import sys
+
+path, count = sys.argv[1], int(sys.argv[2])
+with open(path, 'w') as f:
+    for index in range(count):
+        f.write(f"CMakeFiles/app.dir/src/module_{index // 1000:02d}/source_{index:05d}.cpp.obj ")
+    f.write("\n")
+EOF
+
+cd "$WORK_DIR"
+python3 - "$TOOLS_DIR" "$COUNT" "$MAX_RSS_MB" << 'EOF'
+import os
+import resource
+import sys
+import time
+
+tools_dir, count, max_rss_mb = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+sys.path.insert(0, tools_dir)
+import winetools
+
+start = time.monotonic()
+linker = winetools.LinkExe(verbose=False)
+returncode = linker.link(['/nologo', '/verbose', '@objects1.rsp', 'kernel32.lib', '/out:app.exe'])
+elapsed = time.monotonic() - start
+
+# ru_maxrss is in kilobytes on Linux
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+log_mb = os.path.getsize(linker.last_log) / (1024 * 1024)
+
+print(f"Linked {count} objects in {elapsed:.2f}s, exit code {returncode}")
+print(f"Linker output: {log_mb:.1f} MB in {os.path.basename(linker.last_log)}")
+print(f"Peak RSS of the proxy: {rss_mb:.1f} MB (limit {max_rss_mb} MB)")
+
+if returncode != 0 or rss_mb > max_rss_mb:
+    sys.exit(1)
+EOF
@@ -3,12 +3,10 @@
 # Exit on error
 set -e
 
-# Add the tools directory to the PATH
+# The toolchain file refers to the proxies by absolute path, so the tools
+# directory is not added to the PATH
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 PARENT_DIR="$(dirname "$SCRIPT_DIR")"
-TOOLS_DIR="$PARENT_DIR/tools"
-
-export PATH="$TOOLS_DIR:$PATH"
 
 # Create build directory
 BUILD_DIR="$SCRIPT_DIR/build"
@@ -0,0 +1,53 @@
+#!/bin/bash
+
+# Build the example twice in different directories with deterministic
+# outputs enabled and check that the object files are byte-identical.
+#
+# Usage: check_deterministic.sh [BUILD_DIR_A BUILD_DIR_B]
+#
+# The default build directories have paths of different lengths on purpose:
+# the tools see the build directory through a fixed Wine drive, so the
+# embedded paths do not depend on where (or how deep) the build is.
+
+# Exit on error
+set -e
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+PARENT_DIR="$(dirname "$SCRIPT_DIR")"
+
+BUILD_A="$(realpath -m "${1:-$SCRIPT_DIR/build-det-a}")"
+BUILD_B="$(realpath -m "${2:-$SCRIPT_DIR/build-deterministic-b}")"
+
+echo "Comparing $BUILD_A (${#BUILD_A} characters) with $BUILD_B (${#BUILD_B} characters)"
+
+# The build drive lives in the Wine prefix, which the first Wine run creates
+if [ ! -d "${WINEPREFIX:-$HOME/.wine}/dosdevices" ]; then
+    wine cmd /c exit > /dev/null 2>&1 || true
+fi
+
+for BUILD_DIR in "$BUILD_A" "$BUILD_B"; do
+    rm -rf "$BUILD_DIR"
+    cmake -S "$SCRIPT_DIR" -B "$BUILD_DIR" \
+        -DCMAKE_TOOLCHAIN_FILE="$PARENT_DIR/vc6-toolchain.cmake" \
+        -DVC6_DETERMINISTIC=ON
+    cmake --build "$BUILD_DIR"
+done
+
+# Compare every object and library file between the two builds
+STATUS=0
+cd "$BUILD_A"
+for FILE in $(find . -name "*.obj" -o -name "*.lib"); do
+    if cmp -s "$FILE" "$BUILD_B/$FILE"; then
+        echo "identical: $FILE"
+    else
+        echo "DIFFERENT: $FILE"
+        STATUS=1
+    fi
+done
+
+if [ $STATUS -ne 0 ]; then
+    echo "Outputs are not deterministic"
+    exit 1
+fi
+
+echo "All outputs are byte-identical"
@@ -0,0 +1,89 @@
+#!/bin/bash
+
+# Time the startup of the proxy tools and fail when it goes over a budget.
+#
+# Usage: check_startup.sh [BUDGET_MS]
+#
+# tools/cl.py, tools/link.py and cl/link symlinks to vc6proxy.pyz are run
+# with stub wine and winepath commands that exit immediately, so only the
+# proxy's own cost (interpreter start, imports, argument translation and
+# batch file handling) is measured. The median of several runs of each tool
+# is compared with the budget (default 150 ms, or VC6_STARTUP_BUDGET_MS).
+# /opt/vc/vc6proxy.pyz is used when it exists (set VC6_PROXY_PYZ to use
+# another one); otherwise a temporary zipapp is built like in the Dockerfile.
+
+# Exit on error
+set -e
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+PARENT_DIR="$(dirname "$SCRIPT_DIR")"
+TOOLS_DIR="$PARENT_DIR/tools"
+
+BUDGET_MS="${1:-${VC6_STARTUP_BUDGET_MS:-150}}"
+RUNS=11
+PYZ="${VC6_PROXY_PYZ:-/opt/vc/vc6proxy.pyz}"
+
+WORK_DIR="$(mktemp -d)"
+trap 'rm -rf "$WORK_DIR"' EXIT
+
+# Stub wine and winepath so the measurement does not include Wine itself
+mkdir -p "$WORK_DIR/bin"
+for STUB in wine winepath; do
+    printf '#!/bin/sh\nexit 0\n' > "$WORK_DIR/bin/$STUB"
+    chmod +x "$WORK_DIR/bin/$STUB"
+done
+export PATH="$WORK_DIR/bin:$PATH"
+
+# Build a temporary zipapp when the installed one is not available
+if [ ! -f "$PYZ" ]; then
+    mkdir -p "$WORK_DIR/pyz"
+    cp "$TOOLS_DIR/winetools.py" "$TOOLS_DIR/vc6proxy.py" "$WORK_DIR/pyz"
+    python3 -m compileall -b -q "$WORK_DIR/pyz"
+    python3 -m zipapp "$WORK_DIR/pyz" -m vc6proxy:main -p "/usr/bin/python3 -S" -o "$WORK_DIR/vc6proxy.pyz"
+    PYZ="$WORK_DIR/vc6proxy.pyz"
+fi
+
+# The tool is selected by the name of the symlink
+mkdir -p "$WORK_DIR/pyz-links"
+ln -s "$PYZ" "$WORK_DIR/pyz-links/cl"
+ln -s "$PYZ" "$WORK_DIR/pyz-links/link"
+
+# Print the median wall time of a command in milliseconds
+median_ms() {
+    local TIMES=()
+    for _ in $(seq $RUNS); do
+        local START=$(date +%s%N)
+        "$@" > /dev/null 2>&1 || true
+        local END=$(date +%s%N)
+        TIMES+=($(( (END - START) / 1000000 )))
+    done
+    printf '%s\n' "${TIMES[@]}" | sort -n | sed -n "$(( (RUNS + 1) / 2 ))p"
+}
+
+cd "$WORK_DIR"
+
+STATUS=0
+for TOOL in "$TOOLS_DIR/cl.py" "$TOOLS_DIR/link.py" "$WORK_DIR/pyz-links/cl" "$WORK_DIR/pyz-links/link"; do
+    # Warm up the page cache and the bytecode cache; a proxy that fails
+    # early would look fast, so the warm-up run has to succeed
+    if ! "$TOOL" /nologo > "$WORK_DIR/warmup.log" 2>&1; then
+        echo "FAILED: $TOOL"
+        cat "$WORK_DIR/warmup.log"
+        exit 1
+    fi
+
+    MS=$(median_ms "$TOOL" /nologo)
+    if [ "$MS" -le "$BUDGET_MS" ]; then
+        echo "ok: $TOOL ${MS} ms"
+    else
+        echo "OVER BUDGET: $TOOL ${MS} ms"
+        STATUS=1
+    fi
+done
+
+if [ $STATUS -ne 0 ]; then
+    echo "Proxy startup is over the budget of ${BUDGET_MS} ms"
+    exit 1
+fi
+
+echo "Proxy startup is within the budget of ${BUDGET_MS} ms"
@@ -0,0 +1 @@
+vc6proxy.py
\ No newline at end of file
@@ -0,0 +1,225 @@
+#!/usr/bin/python3
+"""
+Incrementally mirror the VC6 header directories (ATL, CRT, INCLUDE, MFC)
+into a project folder for IDE indexing.
+
+A manifest in the destination records size, mtime and SHA-256 of every
+synced file. Only new or changed files are placed, as hardlinks or reflinks
+where the filesystem allows it and as copies otherwise, and files that
+disappeared from the source are removed again.
+
+Usage: sync_includes.py [--mode auto|link|reflink|copy] SOURCE_ROOT DEST_ROOT DIR [DIR ...]
+"""
+
+import os
+import sys
+import time
+
+MANIFEST_NAME = ".vc6-sync.json"
+MANIFEST_VERSION = 1
+
+# ioctl request number for FICLONE on Linux (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+MODES = ('auto', 'link', 'reflink', 'copy')
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents."""
+    import hashlib
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def walk_files(root, rel_dir):
+    """Yield (relative path, stat) for every regular file below root/rel_dir."""
+    pending = [rel_dir]
+    while pending:
+        current = pending.pop()
+        try:
+            entries = list(os.scandir(os.path.join(root, current)))
+        except OSError:
+            continue
+        for entry in entries:
+            rel_path = os.path.join(current, entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                pending.append(rel_path)
+            elif entry.is_file():
+                yield rel_path, entry.stat()
+
+def load_manifest(dest_root):
+    """Load the manifest of a previous sync, or an empty one."""
+    import json
+
+    try:
+        with open(os.path.join(dest_root, MANIFEST_NAME), 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {'version': MANIFEST_VERSION, 'files': {}}
+
+def save_manifest(dest_root, manifest):
+    """Atomically write the manifest into the destination."""
+    import json
+
+    path = os.path.join(dest_root, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, sort_keys=True)
+    os.replace(tmp_path, path)
+
+class Placer:
+    """Place files in the destination using the cheapest method that works."""
+    def __init__(self, mode):
+        self.methods = ['link', 'reflink', 'copy'] if mode == 'auto' else [mode]
+        self.counts = dict.fromkeys(('link', 'reflink', 'copy'), 0)
+
+    def _link(self, src, tmp_path):
+        os.link(src, tmp_path)
+
+    def _reflink(self, src, tmp_path):
+        import fcntl
+
+        with open(src, 'rb') as fsrc, open(tmp_path, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        os.utime(tmp_path, ns=(os.stat(src).st_atime_ns, os.stat(src).st_mtime_ns))
+
+    def _copy(self, src, tmp_path):
+        import shutil
+
+        shutil.copy2(src, tmp_path)
+
+    def place(self, src, dest):
+        """Replace dest with the contents of src."""
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp_path = dest + '.vc6-sync-tmp'
+
+        while True:
+            method = self.methods[0]
+            if os.path.lexists(tmp_path):
+                os.unlink(tmp_path)
+            try:
+                getattr(self, '_' + method)(src, tmp_path)
+                break
+            except OSError as e:
+                if len(self.methods) == 1:
+                    raise
+                # Not supported here (e.g. a bind mount on another
+                # filesystem), fall back for this and all later files
+                print(f"{method} not available ({e.strerror}), falling back to {self.methods[1]}")
+                self.methods.pop(0)
+
+        os.replace(tmp_path, dest)
+        # Renaming onto another link of the same file leaves the source name
+        if os.path.lexists(tmp_path):
+            os.unlink(tmp_path)
+        self.counts[method] += 1
+
+def remove_empty_dirs(dest_root, rel_dirs):
+    """Remove directories left empty after stale files were deleted."""
+    for rel_dir in sorted(rel_dirs, key=len, reverse=True):
+        path = os.path.join(dest_root, rel_dir)
+        while rel_dir and os.path.isdir(path) and not os.listdir(path):
+            os.rmdir(path)
+            rel_dir = os.path.dirname(rel_dir)
+            path = os.path.join(dest_root, rel_dir)
+
+def sync(source_root, dest_root, dirs, mode='auto'):
+    """Mirror source_root/<dir> into dest_root/<dir> for every dir. Returns stats."""
+    os.makedirs(dest_root, exist_ok=True)
+    manifest = load_manifest(dest_root)
+    old_files = manifest['files']
+    new_files = {}
+    placer = Placer(mode)
+    unchanged = 0
+
+    for rel_dir in dirs:
+        for rel_path, src_stat in walk_files(source_root, rel_dir):
+            src = os.path.join(source_root, rel_path)
+            dest = os.path.join(dest_root, rel_path)
+            entry = old_files.get(rel_path)
+
+            try:
+                dest_stat = os.stat(dest)
+            except OSError:
+                dest_stat = None
+
+            # The destination is intact when it is still the file we placed
+            dest_intact = (entry is not None and dest_stat is not None
+                           and dest_stat.st_size == entry['size']
+                           and dest_stat.st_mtime_ns == entry['dest_mtime_ns'])
+
+            # Fast path: source and destination unchanged since the last sync
+            if (dest_intact and src_stat.st_size == entry['size']
+                    and src_stat.st_mtime_ns == entry['mtime_ns']):
+                new_files[rel_path] = entry
+                unchanged += 1
+                continue
+
+            # Only hash when the stat data changed, and skip rewriting the
+            # destination if the contents turn out to be the same; a hardlink
+            # to the source always has the same contents
+            digest = file_digest(src)
+            same_file = dest_stat is not None and os.path.samestat(src_stat, dest_stat)
+            if not same_file and not (dest_intact and entry['sha256'] == digest):
+                placer.place(src, dest)
+                dest_stat = os.stat(dest)
+            else:
+                unchanged += 1
+
+            new_files[rel_path] = {
+                'size': src_stat.st_size,
+                'mtime_ns': src_stat.st_mtime_ns,
+                'sha256': digest,
+                'dest_mtime_ns': dest_stat.st_mtime_ns,
+            }
+
+    # Remove files that were synced before but no longer exist in the source
+    removed = 0
+    stale_dirs = set()
+    for rel_path in old_files:
+        if rel_path in new_files:
+            continue
+        dest = os.path.join(dest_root, rel_path)
+        if os.path.lexists(dest):
+            os.unlink(dest)
+            removed += 1
+        stale_dirs.add(os.path.dirname(rel_path))
+    remove_empty_dirs(dest_root, stale_dirs)
+
+    manifest['files'] = new_files
+    save_manifest(dest_root, manifest)
+
+    stats = dict(placer.counts)
+    stats['unchanged'] = unchanged
+    stats['removed'] = removed
+    return stats
+
+def main():
+    args = sys.argv[1:]
+    mode = 'auto'
+    if len(args) >= 2 and args[0] == '--mode':
+        mode = args[1]
+        args = args[2:]
+
+    if mode not in MODES or len(args) < 3:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    source_root, dest_root, dirs = args[0], args[1], args[2:]
+
+    start = time.monotonic()
+    stats = sync(source_root, dest_root, dirs, mode)
+    elapsed = time.monotonic() - start
+
+    print("Synced {0} -> {1}: {2} linked, {3} reflinked, {4} copied, "
+          "{5} unchanged, {6} removed in {7:.2f}s".format(
+              source_root, dest_root, stats['link'], stats['reflink'], stats['copy'],
+              stats['unchanged'], stats['removed'], elapsed))
+
+if __name__ == "__main__":
+    main()
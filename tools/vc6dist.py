@@ -0,0 +1,427 @@
+#!/usr/bin/python3
+"""
+Distributed compile coordinator for VC6 projects.
+
+The coordinator splits a CMake compile_commands.json into one shard per
+worker and sends the compile jobs to worker processes (local or in other
+containers) over a simple TCP protocol. Each worker runs the CLCompiler
+proxy and returns the object file, which the coordinator writes back to the
+build tree before running a single final link.
+
+Workers need the sources at the same paths as the coordinator, e.g. the
+same volume mounted in every container.
+
+Workers run compile commands for whoever can reach them, so every request
+must carry the shared secret from VC6DIST_TOKEN, and a worker refuses to
+listen on anything but a loopback address without one. Only run workers
+on a private network. Local workers started by the coordinator get a
+random token.
+
+Usage:
+  vc6dist.py worker [--host HOST] [--port PORT]
+  vc6dist.py build COMPILE_COMMANDS [--local N] [--workers HOST:PORT,...] [--link "LINK ARGS"]
+
+Protocol: the coordinator sends one JSON line per job
+  {"id": ..., "token": ..., "directory": ..., "arguments": [...], "output": ...}
+and the worker answers with one JSON line
+  {"id": ..., "returncode": ..., "stdout_size": O, "stderr_size": E, "size": N}
+followed by O bytes of compiler stdout, E bytes of stderr (both UTF-8) and
+N bytes of the object file (N is 0 when nothing was produced). The output
+is sent as payloads rather than inside the JSON line, so a compile with a
+lot of diagnostics cannot overflow the line length limit of the reader.
+"""
+
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+DEFAULT_HOST = "127.0.0.1"
+
+# A job is handed to another worker at most this many times when the
+# connection to its worker is lost, so a job that crashes workers cannot
+# take all of them down
+MAX_JOB_ATTEMPTS = 3
+
+# Characters that cmd.exe interprets in the batch line the compile runs in
+CMD_METACHARACTERS = '&|<>^%\r\n'
+
+def load_jobs(compile_commands):
+    """Read compile_commands.json into a list of jobs for the workers."""
+    import json
+    import shlex
+
+    with open(compile_commands, 'r') as f:
+        entries = json.load(f)
+
+    jobs = []
+    for index, entry in enumerate(entries):
+        if 'arguments' in entry:
+            arguments = list(entry['arguments'])
+        else:
+            arguments = shlex.split(entry['command'])
+
+        # The first argument is the compiler proxy itself
+        arguments = arguments[1:]
+
+        output = entry.get('output')
+        if not output:
+            # Older CMake versions do not record the output, take it from /Fo
+            for arg in arguments:
+                if arg.startswith('/Fo'):
+                    output = arg[3:]
+                    break
+        if not output:
+            print(f"Skipping {entry['file']}: no object file in compile command")
+            continue
+
+        directory = entry['directory']
+        jobs.append({
+            'id': index,
+            'directory': directory,
+            'arguments': arguments,
+            'file': entry['file'],
+            'output': os.path.join(directory, output),
+        })
+    return jobs
+
+def make_shards(jobs, count):
+    """Split jobs into count shards of similar total source size."""
+    shards = [[] for _ in range(count)]
+    loads = [0] * count
+
+    def source_size(job):
+        try:
+            return os.path.getsize(os.path.join(job['directory'], job['file']))
+        except OSError:
+            return 0
+
+    # Largest sources first, each to the currently lightest shard
+    for job in sorted(jobs, key=source_size, reverse=True):
+        lightest = loads.index(min(loads))
+        shards[lightest].append(job)
+        loads[lightest] += source_size(job) or 1
+    return shards
+
+def make_reply(job_id, returncode, stdout='', stderr='', data=b''):
+    """Build the (response header, payload bytes) of a job."""
+    stdout = stdout.encode('utf-8')
+    stderr = stderr.encode('utf-8')
+    header = {
+        'id': job_id,
+        'returncode': returncode,
+        'stdout_size': len(stdout),
+        'stderr_size': len(stderr),
+        'size': len(data),
+    }
+    return header, stdout + stderr + data
+
+def check_job(job):
+    """Reject a job that could do more than compile into its own directory.
+
+    Arguments end up in a cmd.exe batch line, so they must not contain
+    command separators or redirections, and the object file that is sent
+    back must be a .obj inside the job's directory.
+    """
+    for value in [job['directory'], job['output']] + list(job['arguments']):
+        if not isinstance(value, str):
+            raise ValueError("arguments must be strings")
+        bad = sorted(set(value) & set(CMD_METACHARACTERS))
+        if bad:
+            raise ValueError("{0!r} contains {1!r}, which cmd.exe would interpret".format(value, ''.join(bad)))
+
+    directory = os.path.realpath(job['directory'])
+    output = os.path.realpath(os.path.join(directory, job['output']))
+    if not output.startswith(directory.rstrip('/') + '/') or not output.lower().endswith('.obj'):
+        raise ValueError("output {0} is not an object file in {1}".format(job['output'], job['directory']))
+
+def run_job(job):
+    """Compile one job with CLCompiler and return (response header, payload bytes).
+
+    Any error, such as a directory that does not exist on this worker, is
+    answered as a failed job instead of ending the connection.
+    """
+    import winetools
+
+    returncode = -1
+    stdout = stderr = ''
+    data = b''
+    try:
+        check_job(job)
+        if not os.path.isdir(job['directory']):
+            raise FileNotFoundError("directory {0} does not exist on this worker".format(job['directory']))
+
+        # The job runs in its own directory, the worker's stays unchanged
+        compiler = winetools.CLCompiler(verbose=False, cwd=job['directory'])
+        try:
+            returncode = compiler.compile(job['arguments'])
+        finally:
+            stdout = compiler.last_stdout or ''
+            stderr = compiler.last_stderr or ''
+
+        # Only a file written by this compile is sent back
+        output = os.path.join(job['directory'], job['output'])
+        produced = [os.path.realpath(path) for path in compiler.last_outputs]
+        if returncode == 0 and os.path.realpath(output) in produced and os.path.exists(output):
+            with open(output, 'rb') as f:
+                data = f.read()
+    except Exception as e:
+        returncode = -1
+        data = b''
+        stderr += "vc6dist worker: {0}: {1}\n".format(type(e).__name__, e)
+
+    return make_reply(job.get('id'), returncode, stdout, stderr, data)
+
+def is_loopback(host):
+    """Check whether a listen address only accepts local connections."""
+    import ipaddress
+
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def serve_worker(host, port, token):
+    """Run a worker that compiles jobs sent by a coordinator holding token."""
+    import hmac
+    import json
+    import socketserver
+
+    if not token and not is_loopback(host):
+        print(f"Refusing to listen on {host} without a shared secret, set VC6DIST_TOKEN")
+        sys.exit(1)
+
+    class WorkerHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    job = json.loads(line)
+                    if not isinstance(job, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as e:
+                    header, data = make_reply(None, -1, stderr="vc6dist worker: invalid request: {0}\n".format(e))
+                else:
+                    if token and not hmac.compare_digest(str(job.get('token', '')), token):
+                        header, data = make_reply(job.get('id'), -1, stderr="vc6dist worker: wrong or missing VC6DIST_TOKEN\n")
+                    else:
+                        header, data = run_job(job)
+                self.wfile.write(json.dumps(header).encode('utf-8') + b"\n")
+                self.wfile.write(data)
+                self.wfile.flush()
+
+    socketserver.TCPServer.allow_reuse_address = True
+    with socketserver.TCPServer((host, port), WorkerHandler) as server:
+        # The coordinator reads this line to find local workers
+        print("vc6dist worker listening on {0}:{1}".format(*server.server_address), flush=True)
+        server.serve_forever()
+
+def write_object(path, data):
+    """Atomically write a collected object file into the build tree."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.vc6dist-tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+async def drive_worker(address, token, own_shard, shards, results, progress, in_flight):
+    """Send a shard to one worker, then steal jobs left in other shards.
+
+    A worker without work keeps waiting while jobs are in flight on other
+    workers, since a job is handed back when its worker's connection is lost.
+    """
+    import asyncio
+    import json
+
+    host, port = address
+
+    def report(job, header):
+        results[job['id']] = header
+        progress[0] += 1
+        status = "ok" if header['returncode'] == 0 else "FAILED ({0})".format(header['returncode'])
+        print(f"[{progress[0]}/{progress[1]}] {host}:{port} {job['file']} {status}")
+        if header['returncode'] != 0:
+            if header['stdout']:
+                print(header['stdout'])
+            if header['stderr']:
+                print(header['stderr'], file=sys.stderr)
+
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError as e:
+        print(f"Cannot reach worker {host}:{port}: {e}")
+        return
+
+    try:
+        while True:
+            if own_shard:
+                job = own_shard.pop(0)
+            elif any(shards):
+                # Work stealing: take from the end of the fullest shard
+                job = max(shards, key=len).pop()
+            elif in_flight[0]:
+                await asyncio.sleep(0.1)
+                continue
+            else:
+                break
+
+            request = {key: job[key] for key in ('id', 'directory', 'arguments', 'output')}
+            request['token'] = token
+            job['attempts'] = job.get('attempts', 0) + 1
+            in_flight[0] += 1
+            try:
+                writer.write(json.dumps(request).encode('utf-8') + b"\n")
+                await writer.drain()
+                line = await reader.readline()
+                if not line:
+                    raise ConnectionResetError("connection closed by the worker")
+                header = json.loads(line)
+                stdout = await reader.readexactly(header['stdout_size'])
+                stderr = await reader.readexactly(header['stderr_size'])
+                data = await reader.readexactly(header['size'])
+                header['stdout'] = stdout.decode('utf-8', errors='replace')
+                header['stderr'] = stderr.decode('utf-8', errors='replace')
+            except (OSError, asyncio.IncompleteReadError) as e:
+                # The connection was lost: hand the job back so another
+                # worker picks it up, unless it has lost workers too often
+                print(f"Worker {host}:{port} failed: {e}")
+                if job['attempts'] < MAX_JOB_ATTEMPTS:
+                    own_shard.insert(0, job)
+                else:
+                    report(job, {'returncode': -1, 'stdout': '', 'stderr':
+                                 f"Giving up after losing {job['attempts']} workers on this job"})
+                break
+            except (ValueError, KeyError) as e:
+                # Not a valid reply, the rest of the stream cannot be trusted
+                print(f"Worker {host}:{port} sent an invalid reply: {e}")
+                report(job, {'returncode': -1, 'stdout': '', 'stderr': f"Invalid reply from {host}:{port}: {e}"})
+                break
+            finally:
+                in_flight[0] -= 1
+
+            if header['returncode'] == 0 and data:
+                write_object(job['output'], data)
+            report(job, header)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+async def coordinate(jobs, addresses, token):
+    """Distribute jobs over the workers and collect the results by job id."""
+    import asyncio
+
+    shards = make_shards(jobs, len(addresses))
+    results = {}
+    progress = [0, len(jobs)]
+    in_flight = [0]
+    await asyncio.gather(*(drive_worker(address, token, shard, shards, results, progress, in_flight)
+                           for address, shard in zip(addresses, shards)))
+    return results
+
+def start_local_workers(count, token):
+    """Start count worker processes on this host and return (processes, addresses)."""
+    import subprocess
+
+    env = dict(os.environ, VC6DIST_TOKEN=token)
+    processes = []
+    addresses = []
+    for _ in range(count):
+        process = subprocess.Popen(
+            [sys.executable, os.path.realpath(__file__), 'worker', '--port', '0'],
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            env=env
+        )
+        line = process.stdout.readline().strip()
+        host, port = line.rsplit(' ', 1)[-1].rsplit(':', 1)
+        processes.append(process)
+        addresses.append((host, int(port)))
+    return processes, addresses
+
+def parse_address(text):
+    """Parse HOST:PORT into a (host, port) tuple."""
+    host, port = text.rsplit(':', 1)
+    return host, int(port)
+
+def build(compile_commands, local_workers, worker_addresses, link_args):
+    """Compile every job from compile_commands on the workers, then link."""
+    import asyncio
+    import secrets
+    import shlex
+
+    jobs = load_jobs(compile_commands)
+    if not jobs:
+        print("No compile jobs found")
+        return 1
+
+    # Local workers share a random secret unless one is given
+    token = os.environ.get('VC6DIST_TOKEN') or secrets.token_hex(16)
+
+    processes = []
+    addresses = [parse_address(address) for address in worker_addresses]
+    if local_workers:
+        processes, local_addresses = start_local_workers(local_workers, token)
+        addresses.extend(local_addresses)
+    if not addresses:
+        print("No workers given, use --local N or --workers HOST:PORT,...")
+        return 1
+
+    try:
+        print(f"Compiling {len(jobs)} files on {len(addresses)} workers")
+        results = asyncio.run(coordinate(jobs, addresses, token))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    missing = [job for job in jobs if job['id'] not in results]
+    failed = [job for job in jobs if results.get(job['id'], {}).get('returncode', 1) != 0]
+    if missing:
+        print(f"{len(missing)} jobs were not run because all workers failed")
+    if failed:
+        print(f"{len(failed)} of {len(jobs)} compiles failed")
+        return 1
+
+    if link_args is None:
+        return 0
+
+    # Single final link of all collected objects on the coordinator
+    import winetools
+
+    objects = [job['output'] for job in jobs]
+    return winetools.LinkExe().link(shlex.split(link_args) + objects)
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ('worker', 'build'):
+        print("Usage:" + __doc__.split("Protocol:")[0].split("Usage:")[1].rstrip())
+        sys.exit(1)
+
+    command = args.pop(0)
+    options = {}
+    positional = []
+    while args:
+        arg = args.pop(0)
+        if arg.startswith('--') and args:
+            options[arg[2:]] = args.pop(0)
+        else:
+            positional.append(arg)
+
+    if command == 'worker':
+        serve_worker(options.get('host', DEFAULT_HOST), int(options.get('port', 0)),
+                     os.environ.get('VC6DIST_TOKEN', ''))
+        return
+
+    if len(positional) != 1:
+        print("Usage: vc6dist.py build COMPILE_COMMANDS [--local N] [--workers HOST:PORT,...] [--link \"LINK ARGS\"]")
+        sys.exit(1)
+
+    workers = [address for address in options.get('workers', '').split(',') if address]
+    sys.exit(build(positional[0], int(options.get('local', 0)), workers, options.get('link')))
+
+if __name__ == "__main__":
+    main()
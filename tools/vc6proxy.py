@@ -0,0 +1,64 @@
+#!/usr/bin/python3 -S
+"""
+Multi-call proxy for the Visual C++ 6.0 tools running in Wine.
+
+The tool is selected by the name this script is invoked as (argv[0]), so
+cl, link, lib, midl and rc (with or without a .py extension) are all symlinks
+to this file. It can also be invoked as "vc6proxy.py <tool> [args...]".
+
+Only os and sys are imported here and winetools imports the rest lazily,
+which keeps the per-invocation startup cost low. The script and winetools
+can be packaged together as a zipapp, see the Dockerfile.
+"""
+
+import os
+import sys
+
+# Tool name -> (proxy class in winetools, method, leading arguments)
+TOOLS = {
+    'cl': ('CLCompiler', 'compile', []),
+    'link': ('LinkExe', 'link', []),
+    'lib': ('LinkExe', 'link', ['/lib']),
+    'midl': ('MidlCompiler', 'compile', []),
+    'rc': ('RcCompiler', 'compile', []),
+}
+
+def tool_name(path):
+    """Return the tool name for an invocation path such as /opt/vc/tools/cl.py."""
+    name = os.path.basename(path).lower()
+    for suffix in ('.py', '.pyz', '.exe'):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+def main(argv=None):
+    """Dispatch to the proxy selected by argv[0] and exit with its return code."""
+    argv = sys.argv if argv is None else argv
+    name = tool_name(argv[0])
+    args = argv[1:]
+
+    # Allow "vc6proxy.py cl ..." when not invoked through a symlink
+    if name not in TOOLS and args and tool_name(args[0]) in TOOLS:
+        name = tool_name(args[0])
+        args = args[1:]
+
+    if name not in TOOLS:
+        print("Usage: vc6proxy.py {0} [args...]".format('|'.join(sorted(TOOLS))))
+        print("Or invoke it through one of the tool symlinks (cl, link, lib, midl, rc).")
+        sys.exit(2)
+
+    # Make winetools importable when run as a plain script
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    if script_dir not in sys.path:
+        sys.path.append(script_dir)
+
+    import winetools
+
+    class_name, method, leading_args = TOOLS[name]
+    proxy = getattr(winetools, class_name)()
+
+    # Run the tool and return its exit code
+    sys.exit(getattr(proxy, method)(leading_args + args))
+
+if __name__ == "__main__":
+    main()
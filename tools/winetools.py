@@ -2,32 +2,68 @@
 
 import os
 import sys
-import subprocess
-import tempfile
-import re
-import shutil
-import platform
-from pathlib import Path
+
+# Every CMake compile starts a proxy, so only os and sys are imported up
+# front; other modules are imported by the functions that need them.
 
 # Constants
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
 ROOT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
 
+# Persistent cache shared by every build directory using these tools
+CACHE_DIR = os.environ.get("VC6_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "vc6-docker")
+
+# Path fragments CMake uses for its configure-time test projects
+PROBE_DIR_MARKERS = (
+    "/CMakeFiles/CMakeTmp/",
+    "/CMakeFiles/CMakeScratch/",
+    "/CompilerIdC/",
+    "/CompilerIdCXX/",
+)
+
 # Check if running on Windows
-IS_WINDOWS = platform.system() == "Windows"
+IS_WINDOWS = sys.platform == "win32"
+
+# Process-wide cache of winepath conversions
+_PATH_CACHE = {}
+
+# Read size for response files and for echoing streamed tool output
+RESPONSE_CHUNK_SIZE = 64 * 1024
 
-def unix_to_wine(path):
-    """Convert a Unix path to a Wine-compatible path using winepath if available."""
+# Amount of streamed tool output kept in memory for error detection
+OUTPUT_TAIL_SIZE = 64 * 1024
+
+def _path_cache_key(direction, path, cwd=None):
+    """Build a path cache key; relative paths depend on the working directory."""
+    if os.path.isabs(path):
+        return (direction, path)
+    return (direction, cwd or os.getcwd(), path)
+
+def unix_to_wine(path, cwd=None):
+    """Convert a Unix path to a Wine-compatible path using winepath if available.
+
+    Relative paths are resolved against cwd (default: the current directory).
+    """
     if IS_WINDOWS:
         return path
     
+    key = _path_cache_key('w', path, cwd)
+    if key not in _PATH_CACHE:
+        _PATH_CACHE[key] = _unix_to_wine_uncached(path, cwd)
+    return _PATH_CACHE[key]
+
+def _unix_to_wine_uncached(path, cwd=None):
+    import subprocess
+    
     try:
         # Try to use winepath command if available
         process = subprocess.Popen(
             ["winepath", "-w", path],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            universal_newlines=True
+            universal_newlines=True,
+            cwd=cwd
         )
         stdout, stderr = process.communicate()
         
@@ -42,18 +78,27 @@ def unix_to_wine(path):
         return "Z:" + path
     return path
 
-def wine_to_unix(path):
+def wine_to_unix(path, cwd=None):
     """Convert a Wine path to a Unix-compatible path using winepath if available."""
     if IS_WINDOWS:
         return path
     
+    key = _path_cache_key('u', path, cwd)
+    if key not in _PATH_CACHE:
+        _PATH_CACHE[key] = _wine_to_unix_uncached(path, cwd)
+    return _PATH_CACHE[key]
+
+def _wine_to_unix_uncached(path, cwd=None):
+    import subprocess
+    
     try:
         # Try to use winepath command if available
         process = subprocess.Popen(
             ["winepath", "-u", path],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            universal_newlines=True
+            universal_newlines=True,
+            cwd=cwd
         )
         stdout, stderr = process.communicate()
         
@@ -64,7 +109,7 @@ def wine_to_unix(path):
         pass
     
     # Fallback conversion - simple but less reliable
-    if re.match(r'^[A-Za-z]:', path):
+    if len(path) >= 2 and path[0].isalpha() and path[1] == ':':
         # Remove drive letter and convert backslashes
         drive_letter = path[0]
         if drive_letter.lower() == 'z':
@@ -78,36 +123,140 @@ def wine_to_unix(path):
     # For relative paths, just replace backslashes
     return path.replace("\\", "/")
 
-def run_command_with_wine(cmd, env=None, cwd=None):
-    """Run a command with Wine, handling the environment and working directory."""
-    if IS_WINDOWS:
-        # On Windows, run the command directly
-        process = subprocess.Popen(
-            cmd, 
-            env=env, 
-            cwd=cwd, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE,
-            universal_newlines=True,
-            shell=True
-        )
+def unix_to_wine_fast(path):
+    """Convert a Unix path to a Wine path without calling winepath.
+
+    Relies on Wine's default Z: drive mapping to /. Bare file names such as
+    kernel32.lib are returned unchanged so LINK.EXE searches its LIB path.
+    """
+    if IS_WINDOWS or '/' not in path:
+        return path
+    if os.path.isabs(path):
+        path = "Z:" + path
+    return path.replace('/', '\\')
+
+def iter_response_tokens(path, chunk_size=RESPONSE_CHUNK_SIZE):
+    """Yield the arguments of a response file, reading it in fixed-size chunks.
+
+    CMake writes all objects of a link on a single line, so the file is not
+    read line by line; only the current chunk and one partial token are
+    kept in memory. Double quotes group words and are removed.
+    """
+    import re
+    
+    # Runs of quoted and unquoted text; an unterminated quote runs to the
+    # end of the buffer and is completed by the next chunk
+    token_pattern = re.compile(r'(?:"[^"]*"|[^\s"])+(?:"[^"]*$)?|"[^"]*$')
+    
+    pending = ''
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            data = pending + chunk
+            pending = ''
+            for match in token_pattern.finditer(data):
+                # A token touching the end of the buffer may continue in the next chunk
+                if chunk and match.end() == len(data):
+                    pending = match.group()
+                    break
+                yield match.group().replace('"', '')
+            if not chunk:
+                return
+
+def read_tail(path, size):
+    """Return the last size bytes of a text file as a string."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - size))
+        return f.read().decode('utf-8', errors='replace')
+
+def run_command_with_wine(cmd, env=None, cwd=None, output_path=None):
+    """Run a command with Wine, handling the environment and working directory.
+
+    With output_path, stdout and stderr are written to that file instead of
+    being kept in memory, and empty strings are returned for both.
+    """
+    import subprocess
+    
+    if output_path:
+        stdout_target = open(output_path, 'wb')
+        stderr_target = subprocess.STDOUT
     else:
-        # On Unix, use Wine
-        wine_cmd = ['wine'] + cmd
-        process = subprocess.Popen(
-            wine_cmd, 
-            env=env, 
-            cwd=cwd, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE,
-            universal_newlines=True
-        )
+        stdout_target = subprocess.PIPE
+        stderr_target = subprocess.PIPE
+    
+    try:
+        if IS_WINDOWS:
+            # On Windows, run the command directly
+            process = subprocess.Popen(
+                cmd, 
+                env=env, 
+                cwd=cwd, 
+                stdout=stdout_target, 
+                stderr=stderr_target,
+                universal_newlines=True,
+                shell=True
+            )
+        else:
+            # On Unix, use Wine
+            wine_cmd = ['wine'] + cmd
+            process = subprocess.Popen(
+                wine_cmd, 
+                env=env, 
+                cwd=cwd, 
+                stdout=stdout_target, 
+                stderr=stderr_target,
+                universal_newlines=True
+            )
+        
+        stdout, stderr = process.communicate()
+    finally:
+        if output_path:
+            stdout_target.close()
+    return process.returncode, stdout or '', stderr or ''
+
+async def run_command_with_wine_async(cmd, env=None, cwd=None, output_path=None):
+    """Asynchronous variant of run_command_with_wine for use from an event loop."""
+    import asyncio
+    
+    if output_path:
+        stdout_target = open(output_path, 'wb')
+        stderr_target = asyncio.subprocess.STDOUT
+    else:
+        stdout_target = asyncio.subprocess.PIPE
+        stderr_target = asyncio.subprocess.PIPE
     
-    stdout, stderr = process.communicate()
-    return process.returncode, stdout, stderr
+    try:
+        if IS_WINDOWS:
+            import subprocess
+            process = await asyncio.create_subprocess_shell(
+                subprocess.list2cmdline(cmd),
+                env=env,
+                cwd=cwd,
+                stdout=stdout_target,
+                stderr=stderr_target
+            )
+        else:
+            process = await asyncio.create_subprocess_exec(
+                'wine', *cmd,
+                env=env,
+                cwd=cwd,
+                stdout=stdout_target,
+                stderr=stderr_target
+            )
+        
+        stdout, stderr = await process.communicate()
+    finally:
+        if output_path:
+            stdout_target.close()
+    return (process.returncode,
+            (stdout or b'').decode('utf-8', errors='replace'),
+            (stderr or b'').decode('utf-8', errors='replace'))
 
 def create_batch_file(commands):
     """Create a temporary batch file with the given commands."""
+    import tempfile
+    
     fd, path = tempfile.mkstemp(suffix='.bat')
     with os.fdopen(fd, 'w') as f:
         f.write("@echo off\r\n")
@@ -122,55 +271,686 @@ def create_batch_file(commands):
     
     return path
 
+def is_configure_probe(path=None, cwd=None):
+    """Check whether a tool run in cwd belongs to a CMake configure-time test project.
+
+    try_compile projects are recognised by the working directory CMake
+    builds them in; some probe sources (e.g. CMakeCCompilerABI.c) live in
+    CMake's own module directory, so the source path alone is not enough.
+    """
+    cwd = cwd or os.getcwd()
+    candidates = [cwd]
+    if path:
+        candidates.append(os.path.abspath(os.path.join(cwd, path)))
+    for candidate in candidates:
+        candidate = candidate.replace("\\", "/") + "/"
+        if any(marker in candidate for marker in PROBE_DIR_MARKERS):
+            return True
+    return False
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents."""
+    import hashlib
+    
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def tool_identity(exe_name):
+    """Describe a VC6 executable by size and mtime so cache keys change with the toolchain."""
+    exe_path = os.path.join(ROOT_DIR, 'BIN', exe_name)
+    try:
+        st = os.stat(exe_path)
+        return [exe_name, st.st_size, st.st_mtime_ns]
+    except OSError:
+        return [exe_name]
+
+# COFF machine type written by VC6 for x86 objects
+IMAGE_FILE_MACHINE_I386 = 0x14c
+
+# Stable replacement for build directory paths in normalized outputs
+STABLE_WINE_PREFIX = b"Z:\\VC6BUILD"
+
+# Wine drive through which the tools see the build directory in deterministic mode
+DETERMINISTIC_DRIVE = "B:"
+
+def deterministic_prefixes(env, cwd=None):
+    """Return the directories whose paths are mapped to a stable prefix."""
+    prefixes = [cwd or os.getcwd()]
+    for prefix in env.get('VC6_DETERMINISTIC_PREFIXES', '').split(os.pathsep):
+        if prefix:
+            prefixes.append(os.path.abspath(prefix))
+    # Longest first, so nested directories are mapped before their parents
+    return sorted(set(p.rstrip('/') for p in prefixes if p != '/'), key=len, reverse=True)
+
+def _stable_replacement(token, length):
+    """Pad or truncate a stable prefix so it matches the length of the path it replaces."""
+    return (token + b"_" * length)[:length]
+
+def _zero_coff_timestamp(data, offset):
+    """Zero the TimeDateStamp of a COFF object or short import object at offset."""
+    if len(data) < offset + 20:
+        return
+    sig1 = int.from_bytes(data[offset:offset + 2], 'little')
+    sig2 = int.from_bytes(data[offset + 2:offset + 4], 'little')
+    if sig1 == 0 and sig2 == 0xFFFF:
+        # Short import object: Sig1, Sig2, Version, Machine, TimeDateStamp
+        data[offset + 8:offset + 12] = b"\0" * 4
+    elif sig1 == IMAGE_FILE_MACHINE_I386:
+        # Regular COFF header: Machine, NumberOfSections, TimeDateStamp
+        data[offset + 4:offset + 8] = b"\0" * 4
+
+def _normalize_archive(data):
+    """Zero the member dates of a .lib archive and the timestamps of its objects."""
+    pos = 8  # Skip the "!<arch>\n" signature
+    while pos + 60 <= len(data):
+        name = bytes(data[pos:pos + 16]).rstrip()
+        try:
+            size = int(bytes(data[pos + 48:pos + 58]).strip() or b"0")
+        except ValueError:
+            # Not an archive layout we understand, leave the rest untouched
+            return
+        
+        # Member date field
+        data[pos + 16:pos + 28] = b"0".ljust(12)
+        
+        # Linker members ("/") and the long names member ("//") are not objects
+        if name not in (b"/", b"//"):
+            _zero_coff_timestamp(data, pos + 60)
+        
+        # Members are aligned on even offsets
+        pos += 60 + size + (size & 1)
+
+def _map_build_paths(data, prefixes):
+    """Replace build directory paths with stable prefixes of the same length.
+
+    CL.EXE and LINK.EXE only see the Z: form of a path under Wine, so only
+    that form is mapped, and only where the prefix is made of whole path
+    components: Z:\\build does not match inside Z:\\buildtools.
+    """
+    import re
+    
+    # Replacements keep the length unchanged so COFF offsets stay valid
+    for prefix in prefixes:
+        unix_prefix = prefix.encode('utf-8')
+        for sep in (b"\\", b"/"):
+            wine_prefix = b"Z:" + unix_prefix.replace(b"/", sep)
+            # The prefix must be followed by a separator or by a byte that
+            # cannot be part of a file name (NUL, quotes, whitespace, ...)
+            pattern = re.compile(
+                rb'(?<![A-Za-z0-9])' + re.escape(wine_prefix) + rb'(?=[\\/\x00-\x20"*:<>?|]|$)',
+                re.IGNORECASE)
+            stable = _stable_replacement(STABLE_WINE_PREFIX, len(wine_prefix))
+            data = pattern.sub(lambda match: stable, data)
+    return bytearray(data)
+
+def normalize_output(path, prefixes=()):
+    """Make a .obj or .lib file deterministic in place.
+
+    Timestamps are zeroed and Z: paths of the given prefixes are mapped to a
+    stable prefix of the same length. The build directory itself is reached
+    through a BuildDrive, so its paths are already the same in every build.
+    """
+    if not os.path.isfile(path):
+        return False
+    
+    with open(path, 'rb') as f:
+        data = bytearray(f.read())
+    original = bytes(data)
+    
+    if data.startswith(b"!<arch>\n"):
+        _normalize_archive(data)
+    else:
+        _zero_coff_timestamp(data, 0)
+    
+    data = _map_build_paths(data, prefixes)
+    
+    if data != original:
+        with open(path, 'wb') as f:
+            f.write(data)
+    return True
+
+class BuildDrive:
+    """A Wine drive letter mapped to the build directory while a tool runs.
+
+    CL.EXE and LINK.EXE embed absolute paths in their outputs. When the build
+    directory is reached through a fixed drive (B:\\CMakeFiles\\...), those
+    paths are the same whatever the real directory is, including its length.
+    The drive belongs to the whole Wine prefix, so every run holds a shared
+    lock on it and the drive is only repointed to another build directory,
+    under an exclusive lock, when no tool is using it.
+    """
+    def __init__(self, letter, build_dir, dosdevices):
+        self.letter = letter.rstrip(':').upper() + ':'
+        self.build_dir = os.path.abspath(build_dir)
+        self.link = os.path.join(dosdevices, self.letter.lower())
+        self.lock_path = os.path.join(os.path.dirname(dosdevices), '.vc6-build-drive.lock')
+        self._lock = None
+    
+    @classmethod
+    def for_env(cls, env, build_dir):
+        """Return the build drive of the Wine prefix in env, or None if there is no prefix yet."""
+        if IS_WINDOWS:
+            return None
+        prefix = env.get('WINEPREFIX') or os.path.join(os.path.expanduser('~'), '.wine')
+        dosdevices = os.path.join(prefix, 'dosdevices')
+        if not os.path.isdir(dosdevices):
+            return None
+        return cls(env.get('VC6_DETERMINISTIC_DRIVE') or DETERMINISTIC_DRIVE, build_dir, dosdevices)
+    
+    def wine_path(self, path):
+        """Return the drive path of a file in the build directory, or None for other files."""
+        path = os.path.abspath(path)
+        if path != self.build_dir and not path.startswith(self.build_dir.rstrip('/') + '/'):
+            return None
+        relative = os.path.relpath(path, self.build_dir)
+        if relative == '.':
+            return self.letter + '\\'
+        return self.letter + '\\' + relative.replace('/', '\\')
+    
+    def _target(self):
+        try:
+            return os.readlink(self.link)
+        except OSError:
+            return None
+    
+    def acquire(self):
+        """Point the drive at the build directory and hold it until release()."""
+        import fcntl
+        
+        lock = open(self.lock_path, 'a')
+        try:
+            while True:
+                fcntl.flock(lock, fcntl.LOCK_SH)
+                if self._target() == self.build_dir:
+                    break
+                # Another build directory owns the drive: wait until its
+                # tools are done, repoint the drive and check again
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                if self._target() != self.build_dir:
+                    tmp_link = self.link + '.vc6-tmp'
+                    if os.path.lexists(tmp_link):
+                        os.unlink(tmp_link)
+                    os.symlink(self.build_dir, tmp_link)
+                    os.replace(tmp_link, self.link)
+        except BaseException:
+            lock.close()
+            raise
+        self._lock = lock
+    
+    def release(self):
+        """Let other build directories use the drive again."""
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+class ResultCache:
+    """Persistent store of tool results (exit code, output and produced files).
+
+    Entries live under CACHE_DIR/<namespace> and are written atomically, so the
+    cache can be shared between build directories and concurrent builds.
+    """
+    def __init__(self, namespace, root=None):
+        self.directory = os.path.join(root or CACHE_DIR, namespace)
+
+    @staticmethod
+    def make_key(*parts):
+        """Hash JSON-serialisable key parts into a cache key."""
+        import hashlib
+        import json
+        
+        blob = json.dumps(parts, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key, suffix):
+        return os.path.join(self.directory, key[:2], key + suffix)
+
+    def _write_atomic(self, path, data):
+        import tempfile
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def get(self, key):
+        """Return the stored record for a key, or None on a miss."""
+        import json
+        
+        try:
+            with open(self._entry_path(key, '.json'), 'r') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Every output file must still be present for the entry to be usable
+        for index in range(len(record.get('outputs', []))):
+            if not os.path.exists(self._entry_path(key, '.{0}'.format(index))):
+                return None
+        return record
+
+    def restore(self, key, record, destinations):
+        """Copy the cached outputs of a record to their destination paths."""
+        import shutil
+        
+        for index, dest in enumerate(destinations[:len(record.get('outputs', []))]):
+            if os.path.dirname(dest):
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.copyfile(self._entry_path(key, '.{0}'.format(index)), dest)
+
+    def put(self, key, returncode, stdout, stderr, outputs=()):
+        """Store a result together with copies of the files it produced.
+
+        Nothing is stored (and False is returned) if an output is missing.
+        """
+        import json
+        
+        if not all(os.path.isfile(output) for output in outputs):
+            return False
+        
+        stored = []
+        for index, output in enumerate(outputs):
+            with open(output, 'rb') as f:
+                self._write_atomic(self._entry_path(key, '.{0}'.format(index)), f.read())
+            stored.append(os.path.basename(output))
+
+        record = {
+            'returncode': returncode,
+            'stdout': stdout or '',
+            'stderr': stderr or '',
+            'outputs': stored,
+        }
+        # The JSON record is written last and acts as the commit marker
+        self._write_atomic(self._entry_path(key, '.json'),
+                           json.dumps(record).encode('utf-8'))
+        return True
+
+class ToolResult:
+    """Structured result of a proxied VC6 tool invocation."""
+    __slots__ = ('tool', 'args', 'returncode', 'stdout', 'stderr', 'outputs', 'cached')
+    
+    def __init__(self, tool, args, returncode, stdout='', stderr='', outputs=(), cached=False):
+        self.tool = tool
+        self.args = args
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.outputs = list(outputs)
+        self.cached = cached
+    
+    @property
+    def ok(self):
+        return self.returncode == 0
+    
+    def __repr__(self):
+        return "ToolResult(tool={0!r}, returncode={1!r}, outputs={2!r}, cached={3!r})".format(
+            self.tool, self.returncode, self.outputs, self.cached)
+
+class ToolPlan:
+    """A prepared tool invocation: batch commands plus the files it produces.
+
+    state_files hold incremental state (e.g. .ilk); when the tool rejects
+    them they are deleted and the commands are run once more from scratch.
+    temp_files are deleted after the run. With log_file, the tool output is
+    streamed to that file instead of being captured in memory.
+    """
+    def __init__(self, commands, outputs=(), cache=None, cache_key=None, state_files=(),
+                 temp_files=(), log_file=None):
+        self.commands = commands
+        self.outputs = [output for output in outputs if output]
+        self.cache = cache
+        self.cache_key = cache_key
+        self.state_files = [state for state in state_files if state]
+        self.temp_files = [temp for temp in temp_files if temp]
+        self.log_file = log_file
+
 class ProxyCompiler:
     """Base class for proxy compilers."""
-    def __init__(self, env=None):
+    tool_name = None
+    
+    def __init__(self, env=None, verbose=True, cwd=None):
         self.env = env or os.environ.copy()
+        self.verbose = verbose
+        
+        # Working directory of the tool run; None means the current directory.
+        # Relative paths in the arguments are resolved against it.
+        self.cwd = os.path.abspath(cwd) if cwd else None
+        self.last_stdout = ''
+        self.last_stderr = ''
+        self.last_outputs = []
+        self.last_cached = False
+        self.last_log = None
+        
+        # Opt-in normalization of .obj/.lib outputs for content-based caching
+        self.deterministic = self.env.get('VC6_DETERMINISTIC', '0') == '1'
+        
+        # Deterministic runs see the build directory through a fixed drive
+        self.build_drive = None
+        if self.deterministic:
+            build_dir = self.env.get('VC6_DETERMINISTIC_BUILD_DIR') or self.cwd or os.getcwd()
+            self.build_drive = BuildDrive.for_env(self.env, build_dir)
+            if self.build_drive is None:
+                self._log("No Wine prefix yet, build paths are not mapped to a drive")
     
-    def _run_batch(self, commands):
-        """Run a batch file with the specified commands."""
-        batch_path = create_batch_file(commands)
+    def _log(self, *args, **kwargs):
+        """Print diagnostic output unless running quietly (library use)."""
+        if self.verbose:
+            print(*args, **kwargs)
+    
+    def _path(self, path):
+        """Resolve a path from the arguments against the working directory of the run."""
+        if not path or self.cwd is None or os.path.isabs(path):
+            return path
+        return os.path.join(self.cwd, path)
+    
+    def _to_wine(self, path):
+        """Convert a path from the arguments to a Wine path."""
+        if self.build_drive:
+            wine_path = self.build_drive.wine_path(self._path(path))
+            if wine_path:
+                return wine_path
+        return unix_to_wine(path, self.cwd)
+    
+    def _to_wine_fast(self, path):
+        """Convert a path from the arguments without winepath, see unix_to_wine_fast."""
+        if self.build_drive and os.path.isabs(path):
+            wine_path = self.build_drive.wine_path(path)
+            if wine_path:
+                return wine_path
+        return unix_to_wine_fast(path)
+    
+    def _prepare(self, args):
+        """Translate proxy arguments into a ToolPlan."""
+        raise NotImplementedError
+    
+    def _make_plan(self, args):
+        """Prepare a ToolPlan whose file paths are resolved against the working directory."""
+        plan = self._prepare(args)
+        plan.outputs = [self._path(output) for output in plan.outputs]
+        plan.state_files = [self._path(state) for state in plan.state_files]
+        plan.log_file = self._path(plan.log_file)
+        return plan
+    
+    def _normalize_outputs(self, outputs):
+        """Normalize produced object and library files when deterministic mode is on."""
+        if not self.deterministic:
+            return
+        prefixes = deterministic_prefixes(self.env, self.cwd)
+        for output in outputs:
+            if output and output.lower().endswith(('.obj', '.lib')):
+                if normalize_output(output, prefixes):
+                    self._log(f"Normalized {output}")
+    
+    def _lookup(self, plan):
+        """Return a cached result record for the plan, if any."""
+        if plan.cache is None or plan.cache_key is None:
+            return None
+        return plan.cache.get(plan.cache_key)
+    
+    def _replay(self, plan, record):
+        """Restore cached outputs and report the recorded result."""
+        self._log("Using cached result:", plan.cache_key)
+        plan.cache.restore(plan.cache_key, record, plan.outputs)
+        self.last_stdout = record['stdout']
+        self.last_stderr = record['stderr']
+        self.last_outputs = plan.outputs
+        self.last_cached = True
+        if self.last_stdout:
+            self._log(self.last_stdout)
+        if self.last_stderr:
+            self._log(self.last_stderr, file=sys.stderr)
+        return record['returncode']
+    
+    def _complete(self, plan, returncode):
+        """Post-process the outputs of a finished tool run."""
+        self.last_outputs = plan.outputs
+        self.last_cached = False
+        if returncode == 0:
+            self._normalize_outputs(plan.outputs)
+        if plan.cache is not None and plan.cache_key is not None and self._cacheable(returncode):
+            # Failed runs are replayed without outputs
+            plan.cache.put(plan.cache_key, returncode, self.last_stdout, self.last_stderr,
+                           plan.outputs if returncode == 0 else [])
+        return returncode
+    
+    def _cacheable(self, returncode):
+        """Check whether a result came from the tool itself rather than from Wine.
+
+        Successes are always the tool's; a failure is only trusted when the
+        tool printed one of its own diagnostics (C2065, LNK1104, RC2135, ...),
+        so a Wine start-up problem is never stored as a failed probe.
+        """
+        import re
+        
+        if returncode == 0:
+            return True
+        output = (self.last_stdout or '') + (self.last_stderr or '')
+        return re.search(r'\berror [A-Z]+\d{4}\b', output) is not None
+    
+    def _probe_key(self, exe_name, args, outputs, include_dirs=()):
+        """Build the cache key of a configure-time probe run of exe_name."""
+        import re
+        
+        # Probe projects get a fresh scratch directory and target name
+        # (cmTC_xxxxx) every time, so those are replaced by placeholders;
+        # input files are keyed by their contents
+        cwd = self.cwd or os.getcwd()
+        output_paths = set(os.path.abspath(self._path(output)) for output in outputs)
+        key_args = []
+        inputs = []
+        for arg in args:
+            key_args.append(re.sub(r'cmTC_[0-9a-f]+', 'cmTC', arg.replace(cwd, '<CWD>')))
+            path = self._path(arg[1:] if arg.startswith('@') else arg)
+            if os.path.isfile(path) and os.path.abspath(path) not in output_paths:
+                inputs.append([len(key_args) - 1, file_digest(path)])
+        
+        # Include directories outside the probe are keyed by their mtime so
+        # that adding or removing headers invalidates header checks
+        include_state = []
+        for include_dir in include_dirs:
+            if os.path.abspath(self._path(include_dir)).startswith(cwd):
+                continue
+            try:
+                include_state.append([include_dir, os.stat(self._path(include_dir)).st_mtime_ns])
+            except OSError:
+                include_state.append([include_dir, None])
+        
+        return ResultCache.make_key(
+            'probe', 2,
+            tool_identity(exe_name),
+            key_args,
+            inputs,
+            include_state,
+            self.env.get('INCLUDE', ''),
+            self.env.get('LIB', ''),
+        )
+    
+    def _result(self, args, returncode):
+        """Build a ToolResult from the state of the last run."""
+        return ToolResult(self.tool_name, args, returncode, self.last_stdout,
+                          self.last_stderr, self.last_outputs, self.last_cached)
+    
+    def _state_invalid(self, plan, returncode):
+        """Check whether a failed run was caused by stale incremental state."""
+        return False
+    
+    def _discard_state(self, plan):
+        """Delete the incremental state files of a plan before a clean rerun."""
+        for state_file in plan.state_files:
+            if os.path.exists(state_file):
+                self._log(f"Removing invalid incremental state {state_file}")
+                os.unlink(state_file)
+    
+    def _remove_temp_files(self, plan):
+        """Delete the temporary files of a plan."""
+        for temp_file in plan.temp_files:
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+    
+    def run(self, args):
+        """Run the tool with proxy arguments and return its exit code."""
+        plan = self._make_plan(args)
+        try:
+            record = self._lookup(plan)
+            if record is not None:
+                return self._replay(plan, record)
+            
+            if self.build_drive:
+                self.build_drive.acquire()
+            try:
+                returncode = self._run_batch(plan.commands, plan.log_file)
+                if self._state_invalid(plan, returncode):
+                    self._discard_state(plan)
+                    returncode = self._run_batch(plan.commands, plan.log_file)
+            finally:
+                if self.build_drive:
+                    self.build_drive.release()
+            return self._complete(plan, returncode)
+        finally:
+            self._remove_temp_files(plan)
+    
+    async def run_async(self, args):
+        """Run the tool from an event loop and return a ToolResult."""
+        import asyncio
         
+        loop = asyncio.get_running_loop()
+        
+        # Argument translation may call winepath, keep it off the event loop
+        plan = await loop.run_in_executor(None, self._make_plan, args)
         try:
-            if IS_WINDOWS:
-                cmd = [batch_path]
-            else:
-                cmd = ["cmd", "/c", unix_to_wine(batch_path)]
+            record = await loop.run_in_executor(None, self._lookup, plan)
+            if record is not None:
+                returncode = await loop.run_in_executor(None, self._replay, plan, record)
+                return self._result(args, returncode)
             
-            print("-------- Executing batch command --------")
-            print(f"Batch file: {batch_path}")
-            with open(batch_path, 'r') as f:
-                print("Batch contents:")
-                for line in f:
-                    print(f"  {line.rstrip()}")
-            print("----------------------------------------")
+            if self.build_drive:
+                # Waiting for the drive blocks, keep it off the event loop
+                await loop.run_in_executor(None, self.build_drive.acquire)
+            try:
+                returncode = await self._run_batch_async(plan.commands, plan.log_file)
+                if self._state_invalid(plan, returncode):
+                    self._discard_state(plan)
+                    returncode = await self._run_batch_async(plan.commands, plan.log_file)
+            finally:
+                if self.build_drive:
+                    self.build_drive.release()
+            returncode = await loop.run_in_executor(None, self._complete, plan, returncode)
+            return self._result(args, returncode)
+        finally:
+            self._remove_temp_files(plan)
+    
+    def _write_batch(self, commands):
+        """Create the batch file for commands and the command line that runs it."""
+        if self.build_drive:
+            # Relative paths have to resolve on the build drive as well
+            wine_cwd = self.build_drive.wine_path(self.cwd or os.getcwd())
+            if wine_cwd:
+                commands = ['cd /d "{0}"'.format(wine_cwd)] + list(commands)
+        batch_path = create_batch_file(commands)
+        if IS_WINDOWS:
+            cmd = [batch_path]
+        else:
+            cmd = ["cmd", "/c", unix_to_wine(batch_path)]
+        return batch_path, cmd
+    
+    def _collect_log(self, log_file):
+        """Keep the tail of a streamed output log and echo the log in chunks."""
+        import shutil
+        
+        self.last_log = log_file
+        self.last_stdout = read_tail(log_file, OUTPUT_TAIL_SIZE)
+        self.last_stderr = ''
+        if self.verbose:
+            self._log(f"Output written to {log_file}")
+            sys.stdout.flush()
+            with open(log_file, 'rb') as f:
+                shutil.copyfileobj(f, sys.stdout.buffer, RESPONSE_CHUNK_SIZE)
+            sys.stdout.buffer.flush()
+    
+    def _run_batch(self, commands, log_file=None):
+        """Run a batch file with the specified commands."""
+        batch_path, cmd = self._write_batch(commands)
+        
+        try:
+            self._log("-------- Executing batch command --------")
+            self._log(f"Batch file: {batch_path}")
+            if self.verbose:
+                with open(batch_path, 'r') as f:
+                    self._log("Batch contents:")
+                    for line in f:
+                        self._log(f"  {line.rstrip()}")
+            self._log("----------------------------------------")
             
-            returncode, stdout, stderr = run_command_with_wine(cmd, env=self.env)
+            returncode, stdout, stderr = run_command_with_wine(cmd, env=self.env, cwd=self.cwd,
+                                                               output_path=log_file)
+            self.last_stdout = stdout
+            self.last_stderr = stderr
             
-            print("-------- Command output --------")
+            self._log("-------- Command output --------")
             # Print output for debugging
+            if log_file:
+                self._collect_log(log_file)
             if stdout:
-                print(stdout)
+                self._log(stdout)
             if stderr:
-                print(stderr, file=sys.stderr)
-            print("-------------------------------")
+                self._log(stderr, file=sys.stderr)
+            self._log("-------------------------------")
                 
             return returncode
         finally:
             os.unlink(batch_path)
+    
+    async def _run_batch_async(self, commands, log_file=None):
+        """Run a batch file with the specified commands without blocking the event loop."""
+        import asyncio
+        
+        loop = asyncio.get_running_loop()
+        batch_path, cmd = await loop.run_in_executor(None, self._write_batch, commands)
+        
+        try:
+            returncode, stdout, stderr = await run_command_with_wine_async(
+                cmd, env=self.env, cwd=self.cwd, output_path=log_file)
+            self.last_stdout = stdout
+            self.last_stderr = stderr
+            if log_file:
+                self.last_log = log_file
+                self.last_stdout = await loop.run_in_executor(
+                    None, read_tail, log_file, OUTPUT_TAIL_SIZE)
+            return returncode
+        finally:
+            os.unlink(batch_path)
 
 class CLCompiler(ProxyCompiler):
     """Proxy for Microsoft CL compiler."""
-    def __init__(self, env=None):
-        super().__init__(env)
+    tool_name = 'cl'
+    
+    def __init__(self, env=None, verbose=True, cwd=None):
+        super().__init__(env, verbose, cwd)
         self.simplified_compile = False
         self.simplified_src = None
         self.simplified_out = None
         
+        # Cache for CMake configure-time test compiles (disable with VC6_PROBE_CACHE=0)
+        self.probe_cache = None
+        if self.env.get('VC6_PROBE_CACHE', '1') != '0':
+            self.probe_cache = ResultCache('probes')
+        
     def compile(self, args):
         """Compile a file using CL.EXE."""
+        return self.run(args)
+        
+    def _prepare(self, args):
+        """Translate CMake-style CL arguments into a ToolPlan."""
         # Print the original arguments for debugging
-        print("Original args:", args)
+        self._log("Original args:", args)
         
         # Special fix for first CMake test compile
         simplified_compile = False
@@ -218,7 +998,7 @@ class CLCompiler(ProxyCompiler):
         if "-c" in args and any(arg.startswith('/Fo') for arg in args):
             # Get the source file (usually at the end after -c)
             src_idx = args.index("-c") + 1
-            if src_idx < len(args) and os.path.exists(args[src_idx]):
+            if src_idx < len(args) and os.path.exists(self._path(args[src_idx])):
                 src_file = args[src_idx]
                 
                 # Get output file
@@ -233,7 +1013,7 @@ class CLCompiler(ProxyCompiler):
                     simplified_compile = True
                     simplified_src = src_file
                     simplified_out = out_file
-                    print("Will use simplified compile with src:", src_file, "output:", out_file)
+                    self._log("Will use simplified compile with src:", src_file, "output:", out_file)
         
         # Process the arguments to handle common patterns coming from CMake
         processed_args = []
@@ -251,11 +1031,19 @@ class CLCompiler(ProxyCompiler):
                 continue
                 
             # Handle file output directives that need combining
-            elif arg in ['/Fo', '/Fd', '/Fp'] and i + 1 < len(args):
+            elif arg in ['/Fo', '/Fd', '/Fp', '/Fe'] and i + 1 < len(args):
                 processed_args.append(arg + args[i+1])
                 i += 2
                 continue
                 
+            # CMake's default rules name the output with -o: the object file
+            # of a compile, or the executable when CL.EXE also links
+            elif arg == '-o' and i + 1 < len(args):
+                directive = '/Fo' if '-c' in args else '/Fe'
+                processed_args.append(directive + args[i+1])
+                i += 2
+                continue
+                
             # Skip -c and remember the source file that follows
             elif arg == '-c' and i + 1 < len(args):
                 # Replace with Windows-style /c
@@ -274,37 +1062,44 @@ class CLCompiler(ProxyCompiler):
         if src_file and src_file not in processed_args:
             processed_args.append(src_file)
         
+        # Remember the object file (or linked executable) for post-processing
+        obj_out = None
+        for arg in processed_args:
+            if arg.startswith(('/Fo', '/Fe')) and not arg.endswith(('/', '\\')):
+                obj_out = arg[3:]
+                break
+        
         # Convert paths in processed args to Wine paths
         wine_args = []
         for arg in processed_args:
             # Handle flag arguments with '/' prefix - those stay as is
             if arg.startswith('/'):
                 # For directives with embedded paths, extract and convert path part
-                if arg.startswith('/Fo') or arg.startswith('/Fd') or arg.startswith('/Fp'):
+                if arg.startswith(('/Fo', '/Fd', '/Fp', '/Fe')):
                     directive = arg[:3]  # /Fo, /Fd, etc.
                     path = arg[3:]
-                    if os.path.exists(os.path.dirname(path)):
-                        wine_path = unix_to_wine(path)
+                    if os.path.exists(self._path(os.path.dirname(path))):
+                        wine_path = self._to_wine(path)
                         wine_args.append(f'{directive}{wine_path}')
                     else:
                         wine_args.append(arg)
                 elif arg.startswith('/I'):
                     # Handle include directive
                     include_path = arg[2:]  # Remove /I
-                    if os.path.exists(include_path):
-                        wine_path = unix_to_wine(include_path)
+                    if os.path.exists(self._path(include_path)):
+                        wine_path = self._to_wine(include_path)
                         wine_args.append(f'/I{wine_path}')
                     else:
                         wine_args.append(arg)
                 else:
                     wine_args.append(arg)
             # Handle quoted strings carefully
-            elif arg.startswith('"') and arg.endswith('"') and os.path.exists(arg[1:-1]):
-                wine_path = unix_to_wine(arg[1:-1])
+            elif arg.startswith('"') and arg.endswith('"') and os.path.exists(self._path(arg[1:-1])):
+                wine_path = self._to_wine(arg[1:-1])
                 wine_args.append(f'"{wine_path}"')
             # Handle file paths - those get converted
-            elif os.path.exists(arg):
-                wine_args.append(unix_to_wine(arg))
+            elif os.path.exists(self._path(arg)):
+                wine_args.append(self._to_wine(arg))
             # Everything else stays as is
             else:
                 wine_args.append(arg)
@@ -312,16 +1107,16 @@ class CLCompiler(ProxyCompiler):
         # Check if we need to use the simplified compile command
         if simplified_compile:
             # Convert the paths properly
-            wine_src_path = unix_to_wine(simplified_src)
-            wine_out_path = unix_to_wine(simplified_out)
+            wine_src_path = self._to_wine(simplified_src)
+            wine_out_path = self._to_wine(simplified_out)
             
             # Create a simple command with properly converted paths
             wine_args = ['/nologo', '/c']
             
             # Add all include directories
             for include_dir in include_dirs:
-                if os.path.exists(include_dir):
-                    wine_include = unix_to_wine(include_dir)
+                if os.path.exists(self._path(include_dir)):
+                    wine_include = self._to_wine(include_dir)
                     wine_args.append(f'/I{wine_include}')
             
             # Add all define macros
@@ -332,172 +1127,244 @@ class CLCompiler(ProxyCompiler):
             wine_args.append(wine_src_path)
             wine_args.append(f'/Fo{wine_out_path}')
             
-            print("Using simplified compile with properly converted paths")
+            self._log("Using simplified compile with properly converted paths")
+            
+        # Configure-time probes (compiles and links through CL.EXE) are
+        # answered from the persistent cache when possible
+        outputs = [simplified_out if simplified_compile else obj_out]
+        probe = self.probe_cache is not None and is_configure_probe(simplified_src or src_file, self.cwd)
+        if probe and not outputs[0]:
+            # Without an explicit output CL.EXE writes <name>.obj, and
+            # <name>.exe when it links, to the working directory; compiler
+            # identification runs rely on that
+            sources = [arg for arg in args if arg.endswith(('.c', '.cpp', '.cxx'))]
+            if len(sources) == 1:
+                stem = os.path.splitext(os.path.basename(sources[0]))[0]
+                outputs = [stem + '.obj']
+                if '-c' not in args and '/c' not in args:
+                    outputs.append(stem + '.exe')
+        probe_key = None
+        if probe and outputs[0]:
+            probe_key = self._probe_key('CL.EXE', args, outputs, include_dirs)
             
         # Print the processed arguments for debugging
-        print("Processed args:", wine_args)
+        self._log("Processed args:", wine_args)
         
         # Construct CL command
         cl_cmd = "CL.EXE {0}".format(' '.join(wine_args))
         
         # Print the final command for debugging
-        print("Executing: " + cl_cmd)
+        self._log("Executing: " + cl_cmd)
         
-        # Run the command
-        return self._run_batch([cl_cmd])
+        return ToolPlan(
+            [cl_cmd],
+            outputs=outputs,
+            cache=self.probe_cache if probe_key else None,
+            cache_key=probe_key,
+        )
 
 class LinkExe(ProxyCompiler):
     """Proxy for Microsoft LINK.EXE."""
-    def __init__(self, env=None):
-        super().__init__(env)
+    tool_name = 'link'
+    
+    # Linker errors meaning the .ilk/.pdb from the previous link cannot be reused
+    INVALID_STATE_ERRORS = ('LNK1136', 'LNK1201', 'LNK1207', 'LNK1209')
+    
+    def __init__(self, env=None, verbose=True, cwd=None):
+        super().__init__(env, verbose, cwd)
+        
+        # Cache for the links of CMake configure-time test projects (disable with VC6_PROBE_CACHE=0)
+        self.probe_cache = None
+        if self.env.get('VC6_PROBE_CACHE', '1') != '0':
+            self.probe_cache = ResultCache('probes')
+    
+    @staticmethod
+    def _incremental_enabled(options):
+        """Work out whether LINK.EXE will link incrementally with these options."""
+        incremental = None
+        debug = False
+        for option in options:
+            lowered = option.lower()
+            if lowered in ('/incremental', '/incremental:yes'):
+                incremental = True
+            elif lowered == '/incremental:no':
+                incremental = False
+            elif lowered == '/debug':
+                debug = True
+            elif lowered == '/lib':
+                # Static libraries are never linked incrementally
+                return False
+        
+        # VC6 links incrementally by default when /DEBUG is given
+        if incremental is None:
+            return debug
+        return incremental
+    
+    def _state_invalid(self, plan, returncode):
+        """Detect a failed incremental link caused by an unusable .ilk or .pdb.
+
+        Only an error line that names one of the state files counts: the same
+        codes are also reported for a corrupt .obj or .lib (LNK1136), and a
+        locked .pdb (LNK1104) is not fixed by deleting it.
+        """
+        if returncode == 0 or not plan.state_files:
+            return False
+        names = [os.path.basename(state).lower() for state in plan.state_files]
+        output = (self.last_stdout or '') + (self.last_stderr or '')
+        for line in output.splitlines():
+            if not any(code in line for code in self.INVALID_STATE_ERRORS):
+                continue
+            lowered = line.lower()
+            if any(name in lowered for name in names):
+                return True
+        return False
         
     def link(self, args):
         """Link files using LINK.EXE."""
+        return self.run(args)
+        
+    def _iter_args(self, args):
+        """Yield the link arguments, expanding response files as they are read."""
+        for arg in args:
+            if arg.startswith('@') and os.path.exists(self._path(arg[1:])):
+                yield from iter_response_tokens(self._path(arg[1:]))
+            else:
+                # If it doesn't exist, pass it as is
+                yield arg
+    
+    @staticmethod
+    def _quote_option(option):
+        """Quote an option containing whitespace for the LINK.EXE command line.
+
+        Quotes are removed when response files are read, so an option such
+        as /LIBPATH:"C:\\Program Files\\Lib" has to be quoted again.
+        """
+        if option.startswith('"') or not any(char.isspace() for char in option):
+            return option
+        name, sep, value = option.partition(':')
+        if sep and name.startswith('/'):
+            return f'{name}:"{value}"'
+        return f'"{option}"'
+    
+    def _wine_path_arg(self, path):
+        """Convert an /out:, /implib: or /pdb: path if its directory exists."""
+        if os.path.dirname(path) and os.path.exists(self._path(os.path.dirname(path))):
+            return self._to_wine(path)
+        # If it's just a filename without directory, use it as is
+        return path
+    
+    def _prepare(self, args):
+        """Translate CMake-style LINK arguments into a ToolPlan.
+
+        Objects, resources and libraries, including those in CMake response
+        files, are converted one at a time and written straight into a new
+        response file for LINK.EXE, so no list of inputs is kept in memory.
+        """
+        import tempfile
+        
         # Print the original arguments for debugging
-        print("Original link args:", args)
+        self._log("Original link args:", args)
         
         # Extract all relevant parts from the arguments
         out_file = None
         implib_file = None
         pdb_file = None
-        response_files = []
-        obj_files = []
-        lib_files = []
         other_args = []
+        input_count = 0
         
-        i = 0
-        while i < len(args):
-            arg = args[i]
-            
-            # Handle response files (@file)
-            if arg.startswith('@'):
-                response_files.append(arg[1:])  # Remove the @ for path conversion
-                i += 1
-            # Handle combined output file directive
-            elif arg.startswith('/out:'):
-                out_file = arg[5:]  # Remove '/out:'
-                i += 1
-            # Handle combined implib directive
-            elif arg.startswith('/implib:'):
-                implib_file = arg[8:]  # Remove '/implib:'
-                i += 1
-            # Handle combined pdb directive
-            elif arg.startswith('/pdb:'):
-                pdb_file = arg[5:]  # Remove '/pdb:'
-                i += 1
-            # Handle split output file directive
-            elif arg == '/out:' and i + 1 < len(args):
-                out_file = args[i+1]
-                i += 2
-            # Handle split implib directive
-            elif arg == '/implib:' and i + 1 < len(args):
-                implib_file = args[i+1]
-                i += 2
-            # Handle split pdb directive
-            elif arg == '/pdb:' and i + 1 < len(args):
-                pdb_file = args[i+1]
-                i += 2
-            # Handle object files (.obj)
-            elif arg.endswith('.obj'):
-                obj_files.append(arg)
-                i += 1
-            # Handle library files (.lib)
-            elif arg.endswith('.lib'):
-                lib_files.append(arg)
-                i += 1
-            # Any other options
-            else:
-                other_args.append(arg)
-                i += 1
-        
-        # Convert all the file paths to Wine paths
-        wine_args = []
-        
-        # Add other options first
-        wine_args.extend(other_args)
-        
-        # Add converted response files
-        for resp_file in response_files:
-            # Check if the response file exists
-            if os.path.exists(resp_file):
-                wine_resp = unix_to_wine(resp_file)
-                wine_args.append(f'@{wine_resp}')
-            else:
-                # If it doesn't exist, pass it as is
-                wine_args.append(f'@{resp_file}')
-        
-        # Add converted object files
-        for obj_file in obj_files:
-            # Check if the object file exists
-            if os.path.exists(obj_file):
-                wine_obj = unix_to_wine(obj_file)
-                wine_args.append(wine_obj)
-            else:
-                # If it doesn't exist, pass it as is
-                wine_args.append(obj_file)
-        
-        # Add converted library files
-        for lib_file in lib_files:
-            # Check if the library file exists before converting its path
-            if os.path.exists(lib_file):
-                wine_lib = unix_to_wine(lib_file)
-                wine_args.append(wine_lib)
-            else:
-                # If the file doesn't exist, assume it's a system library and pass it as-is
-                wine_args.append(lib_file)
-                print(f"Treating {lib_file} as system library (file not found)")
+        fd, response_path = tempfile.mkstemp(prefix='link-', suffix='.rsp')
+        try:
+            with os.fdopen(fd, 'w', newline='') as response:
+                tokens = self._iter_args(args)
+                for arg in tokens:
+                    # Handle output file directive, combined or split
+                    if arg.startswith('/out:'):
+                        out_file = arg[5:] or next(tokens, None)
+                    # Handle implib directive
+                    elif arg.startswith('/implib:'):
+                        implib_file = arg[8:] or next(tokens, None)
+                    # Handle pdb directive
+                    elif arg.startswith('/pdb:'):
+                        pdb_file = arg[5:] or next(tokens, None)
+                    # Object, compiled resource and library files; names
+                    # without a directory (e.g. kernel32.lib) are searched
+                    # for in the LIB path by LINK.EXE
+                    elif arg.endswith(('.obj', '.res', '.lib')):
+                        wine_input = self._to_wine_fast(arg)
+                        if ' ' in wine_input:
+                            wine_input = f'"{wine_input}"'
+                        response.write(wine_input + "\r\n")
+                        input_count += 1
+                    # Any other options
+                    else:
+                        other_args.append(arg)
+        except BaseException:
+            os.unlink(response_path)
+            raise
         
-        # Add output file directive
+        # Options first, then the inputs and the output directives
+        wine_args = [self._quote_option(arg) for arg in other_args]
+        wine_args.append(f'@{unix_to_wine_fast(response_path)}')
         if out_file:
-            # Make sure the directory exists before converting path
-            if os.path.dirname(out_file) and os.path.exists(os.path.dirname(out_file)):
-                wine_out = unix_to_wine(out_file)
-                wine_args.append(f'/out:{wine_out}')
-            else:
-                # If it's just a filename without directory, use it as is
-                wine_args.append(f'/out:{out_file}')
-        
-        # Add implib directive
+            wine_args.append(self._quote_option(f'/out:{self._wine_path_arg(out_file)}'))
         if implib_file:
-            # Make sure the directory exists before converting path
-            if os.path.dirname(implib_file) and os.path.exists(os.path.dirname(implib_file)):
-                wine_implib = unix_to_wine(implib_file)
-                wine_args.append(f'/implib:{wine_implib}')
-            else:
-                # If it's just a filename without directory, use it as is
-                wine_args.append(f'/implib:{implib_file}')
-                
-        # Add pdb directive
+            wine_args.append(self._quote_option(f'/implib:{self._wine_path_arg(implib_file)}'))
         if pdb_file:
-            # Make sure the directory exists before converting path
-            if os.path.dirname(pdb_file) and os.path.exists(os.path.dirname(pdb_file)):
-                wine_pdb = unix_to_wine(pdb_file)
-                wine_args.append(f'/pdb:{wine_pdb}')
-            else:
-                # If it's just a filename without directory, use it as is
-                wine_args.append(f'/pdb:{pdb_file}')
+            wine_args.append(self._quote_option(f'/pdb:{self._wine_path_arg(pdb_file)}'))
         
         # Print the processed arguments for debugging
-        print("Processed link args:", wine_args)
+        self._log(f"Processed link args: {wine_args} ({input_count} inputs in {response_path})")
         
         # Construct LINK command
         link_cmd = "LINK.EXE {0}".format(' '.join(wine_args))
         
         # Print the final command for debugging
-        print("Executing: " + link_cmd)
+        self._log("Executing: " + link_cmd)
+        
+        # Linker output (/VERBOSE can be very large) is streamed to a log
+        # file next to the output instead of being held in memory
+        log_file = None
+        if out_file and os.path.isdir(self._path(os.path.dirname(out_file) or '.')):
+            log_file = os.path.splitext(out_file)[0] + '.link.log'
+        
+        # Incremental links keep their .ilk next to the output; LINK.EXE derives
+        # its location from /out:, so the state is found again on the next link
+        state_files = []
+        if out_file and self._incremental_enabled(other_args):
+            out_base = os.path.splitext(out_file)[0]
+            state_files.append(out_base + '.ilk')
+            if not pdb_file:
+                state_files.append(out_base + '.pdb')
+            elif pdb_file.lower() != 'none':
+                state_files.append(pdb_file)
+            self._log(f"Incremental link, state kept in {state_files[0]}")
         
-        # Run the command
-        return self._run_batch([link_cmd])
+        # Static and import libraries can be normalized, images are left alone
+        # Configure-time probe links are answered from the persistent cache when possible
+        outputs = [out_file, implib_file]
+        probe_key = None
+        if self.probe_cache and out_file and is_configure_probe(cwd=self.cwd):
+            probe_key = self._probe_key('LINK.EXE', args, [output for output in outputs if output])
+        
+        return ToolPlan([link_cmd], outputs=outputs, state_files=state_files,
+                        cache=self.probe_cache if probe_key else None, cache_key=probe_key,
+                        temp_files=[response_path], log_file=log_file)
 
 class MidlCompiler(ProxyCompiler):
     """Proxy for Microsoft MIDL.EXE."""
-    def __init__(self, env=None):
-        super().__init__(env)
+    tool_name = 'midl'
+    
+    def __init__(self, env=None, verbose=True, cwd=None):
+        super().__init__(env, verbose, cwd)
         
     def compile(self, args):
         """Compile an IDL file using MIDL.EXE."""
+        return self.run(args)
+        
+    def _prepare(self, args):
+        """Translate MIDL arguments into a ToolPlan."""
         # Print the original arguments for debugging
-        print("Original MIDL args:", args)
+        self._log("Original MIDL args:", args)
         
         # Extract all relevant parts from the arguments
         header_file = None
@@ -520,8 +1387,8 @@ class MidlCompiler(ProxyCompiler):
             # Handle other option pairs that take a filename
             elif arg in ['/acf', '/out', '/cstub', '/dlldata', '/proxy', '/sstub', '/tlb'] and i + 1 < len(args):
                 # Convert the filename that follows the option
-                if os.path.exists(os.path.dirname(args[i+1])):
-                    wine_path = unix_to_wine(args[i+1])
+                if os.path.exists(self._path(os.path.dirname(args[i+1]))):
+                    wine_path = self._to_wine(args[i+1])
                     other_args.append(arg)
                     other_args.append(wine_path)
                 else:
@@ -543,8 +1410,8 @@ class MidlCompiler(ProxyCompiler):
         
         # Add converted option arguments
         if header_file:
-            if os.path.exists(os.path.dirname(header_file)):
-                wine_header = unix_to_wine(header_file)
+            if os.path.exists(self._path(os.path.dirname(header_file))):
+                wine_header = self._to_wine(header_file)
                 wine_args.append('/h')
                 wine_args.append(wine_header)
             else:
@@ -553,8 +1420,8 @@ class MidlCompiler(ProxyCompiler):
                 wine_args.append(header_file)
             
         if iid_file:
-            if os.path.exists(os.path.dirname(iid_file)):
-                wine_iid = unix_to_wine(iid_file)
+            if os.path.exists(self._path(os.path.dirname(iid_file))):
+                wine_iid = self._to_wine(iid_file)
                 wine_args.append('/iid')
                 wine_args.append(wine_iid)
             else:
@@ -567,29 +1434,301 @@ class MidlCompiler(ProxyCompiler):
         
         # Add the IDL file at the end
         if idl_file:
-            if os.path.exists(idl_file) or os.path.exists(os.path.dirname(idl_file)):
-                wine_idl = unix_to_wine(idl_file)
+            if os.path.exists(self._path(idl_file)) or os.path.exists(self._path(os.path.dirname(idl_file))):
+                wine_idl = self._to_wine(idl_file)
                 wine_args.append(wine_idl)
             else:
                 # If file doesn't exist (unlikely for IDL file), pass it as is
                 wine_args.append(idl_file)
-                print(f"Warning: IDL file {idl_file} not found, passing as-is")
+                self._log(f"Warning: IDL file {idl_file} not found, passing as-is")
         
         # Print the processed arguments for debugging
-        print("Processed MIDL args:", wine_args)
+        self._log("Processed MIDL args:", wine_args)
         
         # Construct MIDL command
         midl_cmd = "MIDL.EXE {0}".format(' '.join(wine_args))
         
         # Print the final command for debugging
-        print("Executing: " + midl_cmd)
+        self._log("Executing: " + midl_cmd)
+        
+        return ToolPlan([midl_cmd], outputs=[header_file, iid_file])
+
+class RcCompiler(ProxyCompiler):
+    """Proxy for Microsoft RC.EXE (resource compiler)."""
+    tool_name = 'rc'
+    
+    # Resource statement whose last token names a file, e.g.
+    #   IDI_APP ICON DISCARDABLE "res\\app.ico"
+    RESOURCE_PATTERN = (r'^\s*\w+\s+\w+\s+'
+                        r'(?:(?:PRELOAD|LOADONCALL|FIXED|MOVEABLE|DISCARDABLE|PURE|IMPURE|SHARED|NONSHARED)\s+)*'
+                        r'(?:"((?:[^"\\]|\\.)+)"|([^\s",]+\.\w+))\s*$')
+    INCLUDE_PATTERN = r'^\s*#\s*include\s+"([^"]+)"'
+    
+    def __init__(self, env=None, verbose=True, cwd=None):
+        super().__init__(env, verbose, cwd)
+        
+        # Cache for compiled .res files (disable with VC6_RC_CACHE=0)
+        self.rc_cache = None
+        if self.env.get('VC6_RC_CACHE', '1') != '0':
+            self.rc_cache = ResultCache('rc')
+        
+    def compile(self, args):
+        """Compile a resource script using RC.EXE."""
+        return self.run(args)
+    
+    @staticmethod
+    def _resolve(name, search_dirs):
+        """Find a file referenced from a resource script, or None if missing."""
+        name = name.replace('\\', '/')
+        if os.path.isabs(name):
+            return name if os.path.isfile(name) else None
+        for directory in search_dirs:
+            candidate = os.path.join(directory, name)
+            if os.path.isfile(candidate):
+                return candidate
+        return None
+    
+    def _scan_references(self, rc_file, include_dirs):
+        """Collect the files a resource script depends on.
+
+        Returns (references, absolute) where references maps every name in
+        the script and its quoted #includes to the resolved path (None when
+        missing) and absolute lists the Unix absolute paths used directly in
+        rc_file, which have to be rewritten for Wine.
+        """
+        import re
+        
+        resource_re = re.compile(self.RESOURCE_PATTERN, re.IGNORECASE)
+        include_re = re.compile(self.INCLUDE_PATTERN)
+        
+        references = {}
+        absolute = []
+        pending = [rc_file]
+        scanned = set()
+        
+        while pending:
+            script = pending.pop()
+            if script in scanned:
+                continue
+            scanned.add(script)
+            
+            # Relative names are looked up next to the script, in the
+            # current directory and then in the /i include directories
+            search_dirs = [os.path.dirname(script), self.cwd or os.getcwd()] + include_dirs
+            
+            try:
+                with open(script, 'r', encoding='latin-1') as f:
+                    lines = f.readlines()
+            except OSError:
+                continue
+            
+            for line in lines:
+                include_match = include_re.match(line)
+                resource_match = None if include_match else resource_re.match(line)
+                if include_match:
+                    name = include_match.group(1)
+                elif resource_match:
+                    name = resource_match.group(1) or resource_match.group(2)
+                    # Quoted names escape backslashes
+                    name = name.replace('\\\\', '\\')
+                else:
+                    continue
+                
+                resolved = self._resolve(name, search_dirs)
+                references.setdefault(name, resolved)
+                if script == rc_file and name.startswith('/') and name not in absolute:
+                    absolute.append(name)
+                # Quoted includes can reference further resources
+                if include_match and resolved:
+                    pending.append(resolved)
+        
+        return references, absolute
+    
+    def _rewrite_script(self, rc_file, absolute, out_file):
+        """Write a copy of the script with absolute Unix paths converted for Wine."""
+        with open(self._path(rc_file), 'r', encoding='latin-1') as f:
+            content = f.read()
+        
+        for path in absolute:
+            wine_path = self._to_wine(path)
+            content = content.replace(f'"{path}"', '"{0}"'.format(wine_path.replace('\\', '\\\\')))
+            content = content.replace(path, wine_path)
+        
+        wine_rc = os.path.splitext(out_file)[0] + '.wine.rc'
+        with open(self._path(wine_rc), 'w', encoding='latin-1') as f:
+            f.write(content)
+        return wine_rc
+    
+    def _prepare(self, args):
+        """Translate RC arguments into a ToolPlan."""
+        # Print the original arguments for debugging
+        self._log("Original RC args:", args)
+        
+        # Extract all relevant parts from the arguments
+        out_file = None
+        rc_file = None
+        include_dirs = []
+        other_args = []
+        
+        i = 0
+        while i < len(args):
+            arg = args[i]
+            lowered = arg.lower()
+            
+            # Handle split output file directive
+            if lowered in ['/fo', '-fo'] and i + 1 < len(args):
+                out_file = args[i+1]
+                i += 2
+            # Handle combined output file directive
+            elif lowered.startswith(('/fo', '-fo')):
+                out_file = arg[3:]
+                i += 1
+            # Handle split include directory
+            elif lowered in ['/i', '-i'] and i + 1 < len(args):
+                include_dirs.append(args[i+1])
+                i += 2
+            # Handle combined include directory
+            elif lowered.startswith(('/i', '-i')):
+                include_dirs.append(arg[2:])
+                i += 1
+            # Handle other options that take a separate value
+            elif lowered in ['/d', '-d', '/u', '-u', '/l', '-l', '/c', '-c'] and i + 1 < len(args):
+                other_args.append(arg)
+                other_args.append(args[i+1])
+                i += 2
+            # Last argument is the resource script
+            elif i == len(args) - 1:
+                rc_file = arg
+                i += 1
+            # Any other options
+            else:
+                other_args.append(arg)
+                i += 1
+        
+        # RC.EXE runs in the build directory, so the directory of the script
+        # is searched first for the files it references
+        if rc_file and os.path.dirname(os.path.abspath(self._path(rc_file))) not in include_dirs:
+            include_dirs.insert(0, os.path.dirname(os.path.abspath(self._path(rc_file))))
+        
+        if not out_file and rc_file:
+            out_file = os.path.splitext(rc_file)[0] + '.res'
+        
+        # The converted copy of the script is written next to the output
+        if out_file and os.path.dirname(out_file) and not os.path.exists(self._path(os.path.dirname(out_file))):
+            os.makedirs(self._path(os.path.dirname(out_file)), exist_ok=True)
+        
+        references = {}
+        script = rc_file
+        if rc_file and os.path.exists(self._path(rc_file)):
+            references, absolute = self._scan_references(
+                self._path(rc_file), [self._path(include_dir) for include_dir in include_dirs])
+            if absolute:
+                script = self._rewrite_script(rc_file, absolute, out_file)
+                self._log(f"Converted absolute resource paths into {script}")
+        elif rc_file:
+            self._log(f"Warning: resource script {rc_file} not found, passing as-is")
+        
+        # The .res is keyed by the script and every file it references
+        cache_key = None
+        if self.rc_cache and rc_file and os.path.exists(self._path(rc_file)):
+            cache_key = ResultCache.make_key(
+                'rc', 1,
+                tool_identity('RC.EXE'),
+                file_digest(self._path(rc_file)),
+                sorted([name, file_digest(path) if path else None]
+                       for name, path in references.items()),
+                other_args,
+                include_dirs,
+                self.env.get('INCLUDE', ''),
+            )
+        
+        # Convert all the file paths to Wine paths
+        wine_args = list(other_args)
+        
+        for include_dir in include_dirs:
+            if os.path.exists(self._path(include_dir)):
+                wine_args.append('/i')
+                wine_args.append(self._to_wine(include_dir))
+            else:
+                # If path doesn't exist, pass it as is
+                wine_args.append('/i')
+                wine_args.append(include_dir)
+        
+        if out_file:
+            wine_args.append('/fo')
+            wine_args.append(self._to_wine(out_file))
+        
+        # Add the resource script at the end
+        if script:
+            wine_args.append(self._to_wine(script) if os.path.exists(self._path(script)) else script)
+        
+        # Print the processed arguments for debugging
+        self._log("Processed RC args:", wine_args)
+        
+        # Construct RC command
+        rc_cmd = "RC.EXE {0}".format(' '.join(wine_args))
+        
+        # Print the final command for debugging
+        self._log("Executing: " + rc_cmd)
         
-        # Run the command
-        return self._run_batch([midl_cmd])
+        return ToolPlan([rc_cmd], outputs=[out_file],
+                        cache=self.rc_cache if cache_key else None, cache_key=cache_key)
+
+async def _run_many(proxy_class, jobs, concurrency, env, cwds=None):
+    """Run proxy jobs with bounded concurrency, sharing one environment."""
+    import asyncio
+    
+    env = env or os.environ.copy()
+    semaphore = asyncio.Semaphore(concurrency or os.cpu_count() or 1)
+    jobs = list(jobs)
+    cwds = list(cwds) if cwds is not None else [None] * len(jobs)
+    if len(cwds) != len(jobs):
+        raise ValueError("cwds must have one working directory per job")
+    
+    async def run_one(args, cwd):
+        args = list(args)
+        async with semaphore:
+            proxy = proxy_class(env=env, verbose=False, cwd=cwd)
+            try:
+                return await proxy.run_async(args)
+            except OSError as e:
+                # Wine or the tool could not be started at all
+                return ToolResult(proxy.tool_name, args, -1, stderr=str(e))
+            except Exception as e:
+                # A failure while preparing or post-processing one job must not
+                # abandon the others, so it becomes that job's result
+                return ToolResult(proxy.tool_name, args, -1,
+                                  stderr="{0}: {1}".format(type(e).__name__, e))
+    
+    return await asyncio.gather(*(run_one(job, cwd) for job, cwd in zip(jobs, cwds)))
+
+async def compile_many(jobs, concurrency=None, env=None, cwds=None):
+    """Compile many translation units with CL.EXE from one Python process.
+
+    Each job is the argument list cl.py would receive. With cwds, job i runs
+    in directory cwds[i] (e.g. the "directory" of a compile_commands.json
+    entry) and its relative paths are resolved there; by default all jobs
+    run in the current directory. At most `concurrency` Wine processes run
+    at once (default: number of CPUs). Returns one ToolResult per job, in
+    job order.
+    """
+    return await _run_many(CLCompiler, jobs, concurrency, env, cwds)
+
+async def link_many(jobs, concurrency=None, env=None, cwds=None):
+    """Run many LINK.EXE jobs (argument lists as for link.py), see compile_many."""
+    return await _run_many(LinkExe, jobs, concurrency, env, cwds)
+
+async def midl_many(jobs, concurrency=None, env=None, cwds=None):
+    """Run many MIDL.EXE jobs (argument lists as for midl.py), see compile_many."""
+    return await _run_many(MidlCompiler, jobs, concurrency, env, cwds)
+
+async def rc_many(jobs, concurrency=None, env=None, cwds=None):
+    """Run many RC.EXE jobs (argument lists as for rc.py), see compile_many."""
+    return await _run_many(RcCompiler, jobs, concurrency, env, cwds)
 
 if __name__ == "__main__":
     # If run directly, print help
     print("VC6 Wine Tools - Python proxy for building with Visual C++ 6.0 through Wine")
     print("Usage: This script is intended to be used as a module, not run directly.")
-    print("For compiler scripts, use the cl.py, link.py, or midl.py proxy scripts.")
+    print("For compiler scripts, use the cl.py, link.py, midl.py or rc.py proxy scripts.")
     sys.exit(0)
\ No newline at end of file
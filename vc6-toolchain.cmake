@@ -10,6 +10,7 @@ set(TOOLS_DIR "${CMAKE_CURRENT_LIST_DIR}/tools")
 set(CL_PROXY "${TOOLS_DIR}/cl.py")
 set(LINK_PROXY "${TOOLS_DIR}/link.py")
 set(MIDL_PROXY "${TOOLS_DIR}/midl.py")
+set(RC_PROXY "${TOOLS_DIR}/rc.py")
 
 # Configure the C and C++ compilers
 set(CMAKE_C_COMPILER "${CL_PROXY}")
@@ -18,6 +19,19 @@ set(CMAKE_CXX_COMPILER "${CL_PROXY}")
 # Configure the linker
 set(CMAKE_LINKER "${LINK_PROXY}")
 
+# Link executables, DLLs and modules with LINK.EXE rather than through
+# CL.EXE, so linker flags such as /debug and /incremental reach the linker
+set(CMAKE_C_LINK_EXECUTABLE "<CMAKE_LINKER> <CMAKE_C_LINK_FLAGS> <LINK_FLAGS> <OBJECTS> /out:<TARGET> <LINK_LIBRARIES>")
+set(CMAKE_CXX_LINK_EXECUTABLE "<CMAKE_LINKER> <CMAKE_CXX_LINK_FLAGS> <LINK_FLAGS> <OBJECTS> /out:<TARGET> <LINK_LIBRARIES>")
+set(CMAKE_C_CREATE_SHARED_LIBRARY "<CMAKE_LINKER> /dll <LINK_FLAGS> <OBJECTS> /out:<TARGET> /implib:<TARGET_IMPLIB> <LINK_LIBRARIES>")
+set(CMAKE_CXX_CREATE_SHARED_LIBRARY "<CMAKE_LINKER> /dll <LINK_FLAGS> <OBJECTS> /out:<TARGET> /implib:<TARGET_IMPLIB> <LINK_LIBRARIES>")
+set(CMAKE_C_CREATE_SHARED_MODULE "${CMAKE_C_CREATE_SHARED_LIBRARY}")
+set(CMAKE_CXX_CREATE_SHARED_MODULE "${CMAKE_CXX_CREATE_SHARED_LIBRARY}")
+
+# Libraries CL.EXE used to pass to the linker implicitly (the VC6 AppWizard defaults)
+set(CMAKE_C_STANDARD_LIBRARIES_INIT "kernel32.lib user32.lib gdi32.lib winspool.lib comdlg32.lib advapi32.lib shell32.lib ole32.lib oleaut32.lib uuid.lib odbc32.lib odbccp32.lib")
+set(CMAKE_CXX_STANDARD_LIBRARIES_INIT "${CMAKE_C_STANDARD_LIBRARIES_INIT}")
+
 # VC6 specific compiler flags
 set(CMAKE_C_FLAGS_INIT "/nologo /W3 /GX /O2 /D \"WIN32\" /D \"NDEBUG\" /D \"_CONSOLE\"")
 set(CMAKE_CXX_FLAGS_INIT "/nologo /W3 /GX /O2 /D \"WIN32\" /D \"NDEBUG\" /D \"_CONSOLE\"")
@@ -26,8 +40,17 @@ set(CMAKE_CXX_FLAGS_DEBUG_INIT "/nologo /W3 /Gm /GX /ZI /Od /D \"WIN32\" /D \"_D
 
 # Configure the linker flags
 set(CMAKE_EXE_LINKER_FLAGS_INIT "/nologo /machine:I386 /subsystem:console")
+set(CMAKE_SHARED_LINKER_FLAGS_INIT "/nologo /machine:I386 /subsystem:windows")
 set(CMAKE_MODULE_LINKER_FLAGS_INIT "/nologo /machine:I386 /subsystem:windows /dll")
 
+# Debug builds link incrementally; the .ilk is kept next to each output
+set(CMAKE_EXE_LINKER_FLAGS_DEBUG_INIT "/debug /incremental:yes")
+set(CMAKE_SHARED_LINKER_FLAGS_DEBUG_INIT "/debug /incremental:yes")
+set(CMAKE_MODULE_LINKER_FLAGS_DEBUG_INIT "/debug /incremental:yes")
+set(CMAKE_EXE_LINKER_FLAGS_RELEASE_INIT "/incremental:no")
+set(CMAKE_SHARED_LINKER_FLAGS_RELEASE_INIT "/incremental:no")
+set(CMAKE_MODULE_LINKER_FLAGS_RELEASE_INIT "/incremental:no")
+
 # Ensure our proxy scripts are used for static libraries
 set(CMAKE_AR "${LINK_PROXY}")
 set(CMAKE_C_COMPILER_AR "${LINK_PROXY}")
@@ -39,9 +62,24 @@ set(CMAKE_FIND_ROOT_PATH_MODE_LIBRARY ONLY)
 set(CMAKE_FIND_ROOT_PATH_MODE_INCLUDE ONLY)
 set(CMAKE_FIND_ROOT_PATH_MODE_PACKAGE ONLY)
 
+# Optional deterministic outputs: the proxies zero timestamps in .obj/.lib
+# files and run the tools with the build directory mapped to a fixed drive
+option(VC6_DETERMINISTIC "Normalize VC6 object and library outputs" OFF)
+if(VC6_DETERMINISTIC)
+    set(VC6_DETERMINISTIC_LAUNCHER
+        "\"${CMAKE_COMMAND}\" -E env VC6_DETERMINISTIC=1 \"VC6_DETERMINISTIC_BUILD_DIR=${CMAKE_BINARY_DIR}\"")
+    set_property(GLOBAL PROPERTY RULE_LAUNCH_COMPILE "${VC6_DETERMINISTIC_LAUNCHER}")
+    set_property(GLOBAL PROPERTY RULE_LAUNCH_LINK "${VC6_DETERMINISTIC_LAUNCHER}")
+endif()
+
 # Add MIDL compiler command
 set(CMAKE_MIDL_COMPILER "${MIDL_PROXY}")
 
+# Configure the resource compiler; enable it with project(... RC) or
+# enable_language(RC) and add .rc files to a target's sources
+set(CMAKE_RC_COMPILER "${RC_PROXY}")
+set(CMAKE_RC_COMPILE_OBJECT "<CMAKE_RC_COMPILER> <DEFINES> <INCLUDES> <FLAGS> /fo<OBJECT> <SOURCE>")
+
 # Define a function to add IDL files to a target
 function(target_idl_files TARGET)
     foreach(IDL_FILE ${ARGN})
@@ -3,187 +3,303 @@
 
 import os
 import sys
+import shutil
 import subprocess
 import tempfile
 
+# Default CL.EXE flags for the sample project
+DEFAULT_CL_FLAGS = ["/nologo", "/MD", "/W3", "/GX", "/O2", "/DNDEBUG"]
+
+# Standard libraries linked into every executable
+STANDARD_LIBS = [
+    "kernel32.lib", "user32.lib", "gdi32.lib", "winspool.lib", "comdlg32.lib",
+    "advapi32.lib", "shell32.lib", "ole32.lib", "oleaut32.lib", "uuid.lib",
+    "odbc32.lib", "odbccp32.lib",
+]
+
+# Files compiled by CL.EXE
+SOURCE_EXTENSIONS = (".c", ".cc", ".cpp", ".cxx")
+
+# Keep batch command lines well below the 8191 character limit of cmd.exe
+MAX_COMMAND_LENGTH = 7000
+
+# Result of the Wine availability check, computed once per process
+_wine_available = None
+
+# Cache of converted paths, keyed by (direction, path)
+_path_cache = {}
+
 def check_wine_available():
     """Check if Wine and winepath are available."""
-    try:
-        subprocess.run(['which', 'wine'], capture_output=True, check=True)
-        subprocess.run(['which', 'winepath'], capture_output=True, check=True)
-        return True
-    except subprocess.CalledProcessError:
-        print("Error: Wine or winepath not found. This script must run inside the Docker container.")
-        print("Please use ./docker-build.sh instead of running directly.")
-        return False
+    global _wine_available
+    if _wine_available is None:
+        _wine_available = bool(shutil.which('wine') and shutil.which('winepath'))
+        if not _wine_available:
+            print("Error: Wine or winepath not found. This script must run inside the Docker container.")
+            print("Please use ./docker-build.sh instead of running directly.")
+    return _wine_available
+
+def _winepath_many(option, paths):
+    """Convert many paths with a single winepath call."""
+    todo = [path for path in dict.fromkeys(paths) if path and (option, path) not in _path_cache]
+
+    if todo:
+        # Check if winepath is available
+        if not check_wine_available():
+            sys.exit(1)
+
+        result = subprocess.run(['winepath', option] + todo, capture_output=True, text=True)
+        converted = result.stdout.splitlines()
+
+        # winepath prints one line per input; fall back to single calls if not
+        if len(converted) != len(todo):
+            converted = []
+            for path in todo:
+                single = subprocess.run(['winepath', option, path], capture_output=True, text=True)
+                converted.append(single.stdout.strip())
+
+        for path, converted_path in zip(todo, converted):
+            _path_cache[(option, path)] = converted_path.strip().replace('"', '')
+
+    return [_path_cache[(option, path)] if path else path for path in paths]
+
+def unix_to_wine_many(paths):
+    """Convert a list of Unix paths to Wine paths in one winepath call."""
+    return _winepath_many('-w', paths)
+
+def wine_to_unix_many(paths):
+    """Convert a list of Wine paths to Unix paths in one winepath call."""
+    return _winepath_many('-u', paths)
 
 def unix_to_wine(path):
     """Convert a Unix path to a Wine path."""
-    if not path:
-        return path
-    
-    # Check if winepath is available
-    if not check_wine_available():
-        sys.exit(1)
-        
-    result = subprocess.run(['winepath', '-w', path], capture_output=True, text=True)
-    return result.stdout.strip()
+    return unix_to_wine_many([path])[0]
 
 def wine_to_unix(path):
     """Convert a Wine path to Unix path."""
-    if not path:
-        return path
-        
-    # Check if winepath is available
-    if not check_wine_available():
-        sys.exit(1)
-        
-    result = subprocess.run(['winepath', '-u', path], capture_output=True, text=True)
-    return result.stdout.strip()
+    return wine_to_unix_many([path])[0]
 
 def run_cmd(cmd, *args):
     """Run a command through Wine with proper setup."""
+    # Arguments that are existing files (or in existing directories) are
+    # converted to Windows paths, all in one batch
+    is_path = [os.path.exists(arg) or os.path.exists(os.path.dirname(arg)) for arg in args]
+    converted = iter(unix_to_wine_many([arg for arg, path in zip(args, is_path) if path]))
+
+    # Construct the command
+    full_cmd = cmd
+    for arg, path in zip(args, is_path):
+        full_cmd += " " + (next(converted) if path else arg)
+
     # Create a batch file with the commands
     with tempfile.NamedTemporaryFile(suffix='.bat', delete=False) as f:
         batch_file = f.name
         f.write(b"@echo off\r\n")
         f.write(b"call Z:\\opt\\vc\\setup.bat\r\n")
-        
-        # Construct the command
-        full_cmd = cmd
-        for arg in args:
-            # If the argument is a file path, convert it
-            if os.path.exists(arg) or os.path.exists(os.path.dirname(arg)):
-                win_path = unix_to_wine(arg)
-                # Replace any quotes
-                win_path = win_path.replace('"', '')
-                full_cmd += " " + win_path
-            else:
-                full_cmd += " " + arg
-        
         f.write(full_cmd.encode('utf-8') + b"\r\n")
-    
+
     # Run the batch file through Wine
     result = subprocess.run(['wine', 'cmd', '/c', batch_file], capture_output=True, text=True)
-    
+
     # Clean up
     os.unlink(batch_file)
-    
+
     # Return result
     return result.returncode, result.stdout, result.stderr
 
-def compile_file(source, output, *flags):
-    """Compile a C/C++ file using CL.EXE."""
-    # Convert paths to Windows format
-    source_win = unix_to_wine(source)
-    output_win = unix_to_wine(output)
-    
-    # Remove any quotes
-    source_win = source_win.replace('"', '')
-    output_win = output_win.replace('"', '')
-    
+def _batches(items, base_length):
+    """Split items into groups whose joined length keeps the command short enough."""
+    batch = []
+    length = base_length
+    for item in items:
+        if batch and length + len(item) + 1 > MAX_COMMAND_LENGTH:
+            yield batch
+            batch = []
+            length = base_length
+        batch.append(item)
+        length += len(item) + 1
+    if batch:
+        yield batch
+
+def compile_files(sources, output=None, outdir=None, include_dirs=(), defines=(), flags=()):
+    """Compile C/C++ files using CL.EXE.
+
+    A single source may be compiled to an explicit output file; several
+    sources are compiled together into outdir, as many per CL.EXE call as
+    fit on one command line.
+    """
+    if output is None and outdir is None:
+        raise ValueError("compile_files needs an output file or an output directory")
+    if output is not None and len(sources) != 1:
+        raise ValueError("an explicit output file needs exactly one source")
+
     # Make sure the output directory exists
-    os.makedirs(os.path.dirname(output), exist_ok=True)
-    
+    os.makedirs(outdir or os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    # Convert every path in one winepath call
+    target = output or outdir
+    converted = unix_to_wine_many([target] + list(include_dirs) + list(sources))
+    target_win = converted[0]
+    include_win = converted[1:1 + len(include_dirs)]
+    sources_win = converted[1 + len(include_dirs):]
+
     # Construct the command
-    cmd = "Z:\\opt\\vc\\BIN\\CL.EXE /nologo /MD /W3 /GX /O2 /DNDEBUG"
-    
-    # Add include directories
-    cmd += " /I Z:\\project\\include"
-    cmd += " /I Z:\\project\\build\\idl_output\\sample"
-    
-    # Add other flags
+    cmd = "Z:\\opt\\vc\\BIN\\CL.EXE " + " ".join(DEFAULT_CL_FLAGS)
+
+    # Add include directories computed by the caller (e.g. from the target)
+    for include_win_dir in include_win:
+        cmd += f" /I {include_win_dir}"
+
+    # Add macros and other flags
+    for define in defines:
+        cmd += f" /D{define}"
     for flag in flags:
         cmd += " " + flag
-    
-    # Add source and output
-    cmd += f" /c {source_win} /Fo{output_win}"
-    
-    # Run the command
-    print(f"Compiling {source} -> {output}")
-    return run_cmd(cmd)
+
+    # A trailing backslash makes /Fo name a directory
+    if output is None and not target_win.endswith('\\'):
+        target_win += '\\'
+    cmd += f" /Fo{target_win} /c"
+
+    # Run the command once per batch of sources
+    returncode, stdout, stderr = 0, "", ""
+    for batch in _batches(sources_win, len(cmd)):
+        print(f"Compiling {len(batch)} file(s) -> {target}")
+        ret, out, err = run_cmd(cmd + " " + " ".join(batch))
+        stdout += out
+        stderr += err
+        if ret != 0:
+            returncode = ret
+            break
+    return returncode, stdout, stderr
+
+def compile_file(source, output, *flags):
+    """Compile a C/C++ file using CL.EXE."""
+    return compile_files([source], output=output, flags=flags)
 
 def link_exe(output, *objects):
     """Link object files into an executable."""
-    # Convert output path
-    output_win = unix_to_wine(output)
-    output_win = output_win.replace('"', '')
-    
-    # Make sure the output directory exists
-    os.makedirs(os.path.dirname(output), exist_ok=True)
-    
-    # Build the command
-    cmd = f"Z:\\opt\\vc\\BIN\\LINK.EXE /nologo /OUT:{output_win}"
-    
-    # Add object files
+    # Flatten nested lists of objects
+    object_list = []
     for obj in objects:
-        # Check if this is actually a list of objects
         if isinstance(obj, list) or isinstance(obj, tuple):
-            for nested_obj in obj:
-                obj_win = unix_to_wine(nested_obj)
-                obj_win = obj_win.replace('"', '')
-                cmd += f" {obj_win}"
+            object_list.extend(obj)
         else:
-            obj_win = unix_to_wine(obj)
-            obj_win = obj_win.replace('"', '')
-            cmd += f" {obj_win}"
-    
+            object_list.append(obj)
+
+    # Make sure the output directory exists
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    # Convert the output and all objects in one winepath call
+    converted = unix_to_wine_many([output] + object_list)
+    output_win = converted[0]
+    objects_win = converted[1:]
+
+    # Pass the objects in a response file so any number of them fits
+    response_file = os.path.splitext(output)[0] + ".rsp"
+    with open(response_file, 'w') as f:
+        for obj_win in objects_win:
+            f.write(f"\"{obj_win}\"\r\n")
+    response_win = unix_to_wine(response_file)
+
+    # Build the command
+    cmd = f"Z:\\opt\\vc\\BIN\\LINK.EXE /nologo /OUT:{output_win} @{response_win}"
+
     # Add standard libraries
-    cmd += " kernel32.lib user32.lib gdi32.lib winspool.lib comdlg32.lib"
-    cmd += " advapi32.lib shell32.lib ole32.lib oleaut32.lib uuid.lib"
-    cmd += " odbc32.lib odbccp32.lib"
-    
+    cmd += " " + " ".join(STANDARD_LIBS)
+
     # Run the command
     print(f"Linking {output}")
     return run_cmd(cmd)
 
 def compile_idl(idl_file, h_file, c_file, tlb_file):
     """Compile an IDL file using MIDL.EXE."""
-    # Convert paths
-    idl_win = unix_to_wine(idl_file).replace('"', '')
-    h_win = unix_to_wine(h_file).replace('"', '')
-    c_win = unix_to_wine(c_file).replace('"', '')
-    tlb_win = unix_to_wine(tlb_file).replace('"', '')
-    
     # Create output directories
     os.makedirs(os.path.dirname(h_file), exist_ok=True)
     os.makedirs(os.path.dirname(c_file), exist_ok=True)
     os.makedirs(os.path.dirname(tlb_file), exist_ok=True)
-    
+
+    # Convert paths
+    idl_win, h_win, c_win, tlb_win = unix_to_wine_many([idl_file, h_file, c_file, tlb_file])
+
     # Build command
     cmd = f"Z:\\opt\\vc\\BIN\\MIDL.EXE /nologo /h {h_win} /iid {c_win} /tlb {tlb_win} {idl_win}"
-    
+
     # Run command
     print(f"Compiling IDL {idl_file}")
     return run_cmd(cmd)
 
+def parse_compile_args(args):
+    """Parse the arguments of the compile command."""
+    options = {'sources': [], 'output': None, 'outdir': None,
+               'include_dirs': [], 'defines': [], 'flags': []}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == '-o' and i + 1 < len(args):
+            options['output'] = args[i + 1]
+            i += 2
+        elif arg == '--outdir' and i + 1 < len(args):
+            options['outdir'] = args[i + 1]
+            i += 2
+        elif arg == '-I' and i + 1 < len(args):
+            options['include_dirs'].append(args[i + 1])
+            i += 2
+        elif arg.startswith('-I'):
+            options['include_dirs'].append(arg[2:])
+            i += 1
+        elif arg == '-D' and i + 1 < len(args):
+            options['defines'].append(args[i + 1])
+            i += 2
+        elif arg.startswith('-D'):
+            options['defines'].append(arg[2:])
+            i += 1
+        elif arg.lower().endswith(SOURCE_EXTENSIONS):
+            options['sources'].append(arg)
+            i += 1
+        elif arg.startswith('/'):
+            options['flags'].append(arg)
+            i += 1
+        elif arg:
+            options['sources'].append(arg)
+            i += 1
+        else:
+            # Empty arguments come from empty CMake lists
+            i += 1
+    return options
+
 if __name__ == "__main__":
     # Check if we're in the Docker container with Wine available
     if not check_wine_available():
         print("This script must be run inside the Docker container with Wine installed.")
         print("Please use the docker-build.sh script instead.")
         sys.exit(1)
-        
+
     # Simple command-line interface
     if len(sys.argv) < 2:
         print("Usage: winetools.py command [args]")
         sys.exit(1)
-    
+
     command = sys.argv[1]
     args = sys.argv[2:]
-    
+
     if command == "compile":
-        if len(args) < 2:
-            print("Usage: winetools.py compile source output [flags]")
+        options = parse_compile_args(args)
+        if not options['sources'] or not (options['output'] or options['outdir']):
+            print("Usage: winetools.py compile (-o output | --outdir dir) [-I dir] [-D macro] [/flag] source [source ...]")
             sys.exit(1)
-        source = args[0]
-        output = args[1]
-        flags = args[2:]
-        ret, stdout, stderr = compile_file(source, output, *flags)
+        ret, stdout, stderr = compile_files(
+            options['sources'],
+            output=options['output'],
+            outdir=options['outdir'],
+            include_dirs=options['include_dirs'],
+            defines=options['defines'],
+            flags=options['flags'],
+        )
         print(stdout)
         print(stderr, file=sys.stderr)
         sys.exit(ret)
-    
+
     elif command == "link":
         if len(args) < 2:
             print("Usage: winetools.py link output obj1 [obj2 ...]")
@@ -194,7 +310,7 @@ if __name__ == "__main__":
         print(stdout)
         print(stderr, file=sys.stderr)
         sys.exit(ret)
-    
+
     elif command == "idl":
         if len(args) != 4:
             print("Usage: winetools.py idl idl_file h_file c_file tlb_file")
@@ -204,7 +320,7 @@ if __name__ == "__main__":
         print(stdout)
         print(stderr, file=sys.stderr)
         sys.exit(ret)
-    
+
     else:
         print(f"Unknown command: {command}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)